@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASELINE_PATH = os.path.join("data", "results", "benchmarks", "baseline.json")
+SCALES = {"small": 1, "medium": 5, "large": 25}
+
+
+class _OfflineModule(types.ModuleType):
+    # network clients are replaced so a benchmark can never reach yfinance or tavily
+    def __getattr__(self, name):
+        raise RuntimeError(f"{self.__name__}.{name} called during an offline benchmark")
+
+
+for _name in ("yfinance", "tavily"):
+    sys.modules[_name] = _OfflineModule(_name)
+
+from src.decomposition import decompose_markdown
+from src.canonicalizer import FinancialCanonicalizer
+from src.evaluator import FinancialEvaluator
+from src.analytics import StockAnalyst
+from src.noise_filter import NoiseClassifier
+
+LINE_ITEMS = ["Net sales", "Cost of sales", "Gross profit", "Operating income", "Interest expense",
+              "Income before taxes", "Income tax expense", "Net income", "Total assets",
+              "Total liabilities", "Total equity", "Cash and cash equivalents", "Inventories"]
+
+
+# synthetic fixtures
+def make_table(rng, n_rows, years=(2022, 2021, 2020)):
+    header = "| (in millions) | " + " | ".join(str(y) for y in years) + " |"
+    sep = "|---|" + "---:|" * len(years)
+    rows = []
+    for i in range(n_rows):
+        label = LINE_ITEMS[i % len(LINE_ITEMS)]
+        cells = []
+        for _ in years:
+            v = rng.uniform(-5000, 50000)
+            cells.append(f"({abs(v):,.1f})" if v < 0 else f"$ {v:,.1f}")
+        rows.append(f"| {label} | " + " | ".join(cells) + " |")
+    return "\n".join([header, sep] + rows)
+
+
+def make_markdown(rng, n_sections):
+    parts = []
+    for i in range(n_sections):
+        parts.append(f"## Item {i}\n\nManagement discussion of results for segment {i}. " * 3)
+        parts.append("\n" + make_table(rng, 12) + "\n")
+    return "\n".join(parts)
+
+
+def make_decomposed(rng, n_tables, prefix):
+    items = []
+    for i in range(n_tables):
+        items.append({"id": f"{prefix}_{2 * i}", "type": "text", "content": "Consolidated Statements of Operations (in millions)"})
+        items.append({"id": f"{prefix}_{2 * i + 1}", "type": "table", "content": make_table(rng, 12)})
+    return items
+
+
+def make_canonical_dir(root, rng, n_tables, company_id="ACME_2022"):
+    cleaner = FinancialCanonicalizer()
+    decomposed = Path(root) / f"{company_id}_10K_decomposed.json"
+    with open(decomposed, 'w', encoding='utf-8') as f:
+        json.dump(make_decomposed(rng, n_tables, f"{company_id}_10K"), f)
+    out = Path(root) / "canonical"
+    out.mkdir(exist_ok=True)
+    cleaner.process_file(str(decomposed), str(out))
+    return str(out)
+
+
+def make_ohlcv(rng, n_days):
+    close = 100 + np.cumsum(rng.normal(0, 1, n_days))
+    high = close + rng.uniform(0, 2, n_days)
+    low = close - rng.uniform(0, 2, n_days)
+    idx = pd.bdate_range("2020-01-01", periods=n_days)
+    return pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close,
+                         "Volume": rng.integers(1e5, 1e6, n_days)}, index=idx)
+
+
+# timing
+def calibration_workload():
+    # fixed python + numpy work, its time tells how fast the machine is right now compared with the baseline's
+    rng = random.Random(0)
+    rows = [" | ".join(f"{rng.uniform(0, 1e5):,.1f}" for _ in range(8)) for _ in range(400)]
+    parsed = [[float(c.replace(',', '')) for c in row.split(" | ")] for row in rows]
+    return np.sort(np.asarray(parsed), axis=0).sum()
+
+
+def measure(func, repeat, number=1):
+    # every repeat is paired with a calibration run, so a machine that speeds up or slows down mid-run is seen per case
+    times, calib = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calibration_workload()
+        calib.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(times), "min_s": min(times), "calib_s": min(calib)}
+
+
+def build_cases(workdir, scale):
+    rng = random.Random(scale)
+    nprng = np.random.default_rng(scale)
+    cleaner = FinancialCanonicalizer()
+    analyst = StockAnalyst()
+    classifier = NoiseClassifier()
+    queries = [rng.choice(["Explain the long-term debt structure of ACME", "Should I buy ACME before the rally?",
+                           "What is the net margin trend", "Any recommendation on a price target?"]) for _ in range(200 * scale)]
+
+    md_path = Path(workdir) / f"filing_{scale}.md"
+    md_path.write_text(make_markdown(rng, 20 * scale), encoding='utf-8')
+    table_md = make_table(rng, 40 * scale)
+    table_df = cleaner.parse_markdown_table(table_md)
+    cleaned_df = table_df.map(cleaner.clean_cell)
+    raw_cells = table_df.values.flatten().tolist()
+
+    company_dir = Path(workdir) / f"company_{scale}"
+    company_dir.mkdir(exist_ok=True)
+    canonical_dir = make_canonical_dir(company_dir, rng, 10 * scale)
+    evaluator = FinancialEvaluator(canonical_dir, use_cache=False)
+    cached_evaluator = FinancialEvaluator(canonical_dir)
+
+    ohlcv = make_ohlcv(nprng, 250 * scale)
+    scaled = nprng.random((250 * scale, 5))
+
+    return {
+        "decompose_markdown": lambda: decompose_markdown(md_path),
+        "parse_markdown_table": lambda: cleaner.parse_markdown_table(table_md),
+        "parse_markdown_table_typed": lambda: cleaner.parse_markdown_table_typed(table_md),
+        "parse_and_clean_legacy": lambda: cleaner.parse_markdown_table(table_md).map(cleaner.clean_cell),
+        "clean_cell": lambda: [cleaner.clean_cell(c) for c in raw_cells],
+        "is_high_quality": lambda: cleaner.is_high_quality(cleaned_df),
+        "_get_metrics": lambda: evaluator._get_metrics("ACME_2022"),
+        "analyze_company": lambda: evaluator.analyze_company("ACME_2022"),
+        "analyze_company_cached": lambda: cached_evaluator.analyze_company("ACME_2022"),
+        "_calculate_indicators": lambda: analyst._calculate_indicators(ohlcv.copy()),
+        "lstm_window_build": lambda: analyst._build_windows(scaled),
+        "noise_classify_many": lambda: classifier.classify_many(queries),
+    }
+
+
+def run(scales, repeat, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale_name in scales:
+            if only is not None and not any(k.endswith(f"[{scale_name}]") for k in only):
+                continue
+            for case, func in build_cases(workdir, SCALES[scale_name]).items():
+                key = f"{case}[{scale_name}]"
+                if only is not None and key not in only:
+                    continue
+                results[key] = measure(func, repeat)
+                print(f"{key:<40} median {results[key]['median_s'] * 1000:10.3f} ms")
+    return results
+
+
+def machine_factor(res, base):
+    # >1 when the machine (or its load at the time) is slower than when the baseline was saved,
+    # never below 1 so a momentarily quick calibration run can't flag an unchanged case
+    if not res.get("calib_s") or not base.get("calib_s"):
+        return 1.0
+    return max(1.0, res["calib_s"] / base["calib_s"])
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        factor = machine_factor(res, base)
+        # best-of-repeat times, a slow outlier from a busy machine is not a regression
+        limit = base["min_s"] * factor * (1 + tolerance)
+        if res["min_s"] > limit:
+            regressions.append((key, base["min_s"], res["min_s"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Finbench hot paths")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline, 0.5 = +50%%")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # a missing baseline would otherwise pass every run
+        print(f"\nno baseline at {args.baseline}, run again with --save-baseline")
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        # a shared machine can stall for a moment, only a slowdown that shows up again is reported
+        print("\nre-measuring " + ", ".join(key for key, _, _ in regressions))
+        rerun = run(args.scales, args.repeat, only={key for key, _, _ in regressions})
+        regressions = compare(rerun, baseline, args.tolerance)
+    unmeasured = sorted(set(results) - set(baseline))
+    if unmeasured:
+        print(f"\nnot in the baseline yet (re-save it to track them): {', '.join(unmeasured)}")
+    if regressions:
+        print("\nREGRESSIONS DETECTED")
+        for key, base, now in regressions:
+            print(f"  {key}: best {base * 1000:.3f} ms -> {now * 1000:.3f} ms ({now / base:.2f}x)")
+        return 1
+    print(f"\nno regressions vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
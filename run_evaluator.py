@@ -1,35 +1,48 @@
 import os
 import json
 from src.evaluator import FinancialEvaluator
+from src.warehouse import ResultsWarehouse
+from src.batch_validator import load_sectors
 
 def main():
     CANONICAL_DIR = r"C:\Users\ARYA\My Learning\Finbench-LLM\data\processed\canonical"
     OUTPUT_DIR = r"C:\Users\ARYA\My Learning\Finbench-LLM\data\results\evaluations"
+    # everything else sits in the same data/ tree as the reports, laid out like FilingPipeline(root=...)
+    RESULTS_DIR = os.path.dirname(OUTPUT_DIR)
+    FUNDAMENTALS_PATH = os.path.join(RESULTS_DIR, "fundamentals_store.json")
+    DATASET_PATH = os.path.join(os.path.dirname(RESULTS_DIR), "financebench_merged.jsonl")
     
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     evaluator = FinancialEvaluator(CANONICAL_DIR)
+    warehouse = ResultsWarehouse(OUTPUT_DIR)
     
     # get unique ID for every company
-    all_files = os.listdir(CANONICAL_DIR)
-    company_ids = set()
-    for f in all_files:
-        if f.endswith('.csv'):
-            parts = f.split('_')
-            if len(parts) >= 2:
-                company_ids.add(f"{parts[0]}_{parts[1]}")
+    company_ids = evaluator.company_ids()
 
     print(f"finding {len(company_ids)} company entity")
 
-    for cid in company_ids:
-        print(f"Analyzing {cid}...")
-        report = evaluator.analyze_company(cid)
+    # all filings validated in one batch so sector peers can flag outliers
+    sectors = load_sectors(DATASET_PATH) if os.path.exists(DATASET_PATH) else None
+    reports = evaluator.analyze_companies(company_ids, sectors=sectors)
+
+    for cid, report in zip(company_ids, reports):
+        print(f"{cid}: {report['epistemic_status']['data_integrity']}")
         
         # Simpan hasil ke JSON
         output_path = os.path.join(OUTPUT_DIR, f"{cid}_eval.json")
         with open(output_path, 'w') as f:
             json.dump(report, f, indent=4)
+        # keep the columnar copy in step with the json reports
+        warehouse.upsert_report(cid, report, os.stat(output_path).st_mtime_ns)
+
+    warehouse.refresh()
+
+    # multi-year store, every filing's prior-year columns included
+    store = evaluator.build_fundamentals_store(company_ids)
+    store.save(FUNDAMENTALS_PATH)
+    print(f"fundamentals store: {len(store)} observations across {len(store.companies())} companies")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,172 @@
+import json
+import time
+import random
+import argparse
+import threading
+import statistics
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from src.llm_gateway import LLMGateway, is_rate_limited
+
+QUESTIONS = [
+    "Audit the capital structure of {t}",
+    "Is the net margin of {t} consistent with its sector?",
+    "Explain the denominator integrity of {t}",
+    "What business archetype is {t}?",
+    "Compare {t} return on assets with peers",
+]
+TICKERS = ["AAPL", "MSFT", "JNJ", "3M", "NKE", "PEP", "BBCA.JK", "TLKM.JK"]
+
+
+class StubModelServer:
+    # stand-in for the hosted model: a few generation slots, sub-linear batch cost, a request quota
+    def __init__(self, slots=2, base_latency=0.08, per_prompt=0.01, rate=20.0, burst=10):
+        self.slots = threading.BoundedSemaphore(slots)
+        self.base_latency = base_latency
+        self.per_prompt = per_prompt
+        self.rate = rate
+        self.tokens = float(burst)
+        self.burst = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompts = 0
+        self.rejected = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, payload = server.generate(body["prompts"])
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/generate"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _take_token(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.requests += 1
+            if self.tokens < 1:
+                self.rejected += 1
+                return False
+            self.tokens -= 1
+            return True
+
+    def generate(self, prompts):
+        if not self._take_token():
+            return 429, {"error": "Too Many Requests"}
+        with self.slots:
+            time.sleep(self.base_latency + self.per_prompt * len(prompts))
+        with self.lock:
+            self.prompts += len(prompts)
+        return 200, {"answers": [f"[AUDIT] stub answer for: {p[:60]}" for p in prompts]}
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+class StubBridge:
+    # same contract as SovereignLlamaBridge.smart_query, quota errors come back inside the answer
+    def __init__(self, url):
+        self.url = url
+
+    def _post(self, prompts):
+        req = urllib.request.Request(self.url, data=json.dumps({"prompts": prompts}).encode(),
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                answers = json.loads(resp.read())["answers"]
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+            answers = ["Rate Limit reached, please try again later."] * len(prompts)
+        return [{"answer": a, "sources": []} for a in answers]
+
+    def smart_query(self, prompt):
+        return self._post([prompt])[0]
+
+
+class BatchingStubBridge(StubBridge):
+    def smart_query_batch(self, prompts):
+        return self._post(prompts)
+
+
+def run_users(client, users, queries_per_user, seed):
+    latencies, limited = [], 0
+    lock = threading.Lock()
+    # popular questions dominate, like a shared watchlist
+    weights = [1.0 / (i + 1) for i in range(len(TICKERS))]
+
+    def user(idx):
+        nonlocal limited
+        rng = random.Random(seed + idx)
+        for _ in range(queries_per_user):
+            prompt = rng.choice(QUESTIONS).format(t=rng.choices(TICKERS, weights)[0])
+            start = time.perf_counter()
+            result = client.smart_query(prompt)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                limited += is_rate_limited(result)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "queries": len(latencies),
+        "wall_s": wall,
+        "qps": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "rate_limited": limited,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline load test of the LLM gateway against a stub model server")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=10, help="queries per user")
+    parser.add_argument("--rate", type=float, default=20.0, help="stub server requests per second")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    modes = [
+        ("direct", lambda url: StubBridge(url)),
+        ("gateway", lambda url: LLMGateway(StubBridge(url), base_backoff=0.2, max_backoff=2.0)),
+        ("gateway+batch", lambda url: LLMGateway(BatchingStubBridge(url), base_backoff=0.2, max_backoff=2.0)),
+    ]
+    print(f"{args.users} users x {args.queries} queries, stub quota {args.rate:g} req/s\n")
+    print(f"{'mode':<15}{'qps':>8}{'p50 ms':>10}{'p95 ms':>10}{'limited':>9}{'model reqs':>12}{'429s':>7}  gateway")
+    for name, build in modes:
+        server = StubModelServer(rate=args.rate)
+        client = build(server.url)
+        res = run_users(client, args.users, args.queries, args.seed)
+        stats = dict(client.stats) if isinstance(client, LLMGateway) else {}
+        if isinstance(client, LLMGateway):
+            client.close()
+        server.close()
+        print(f"{name:<15}{res['qps']:>8.1f}{res['p50_ms']:>10.1f}{res['p95_ms']:>10.1f}{res['rate_limited']:>9}"
+              f"{server.requests:>12}{server.rejected:>7}  {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+from src.pipeline import FilingPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="decompose -> canonicalize -> index -> evaluate, per filing")
+    parser.add_argument("--root", default="data")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--filings", nargs="+", help="only these filing stems (e.g. 3M_2018_10K)")
+    parser.add_argument("--no-index", action="store_true", help="skip the vector store stage")
+    parser.add_argument("--force", action="store_true", help="ignore fingerprints and rebuild every node")
+    args = parser.parse_args()
+
+    indexer = None
+    if not args.no_index:
+        from src.indexer import FinancialIndexer
+        indexer = FinancialIndexer(f"{args.root}/processed/decomposed", f"{args.root}/database/chroma_db")
+
+    pipeline = FilingPipeline(args.root, workers=args.workers, indexer=indexer)
+    filings = pipeline.discover() if args.filings is None else args.filings
+    print(f"pipeline: {len(filings)} filings, {args.workers} workers")
+
+    pipeline.run(args.filings, force=args.force)
+    print(pipeline.report())
+    for stage, key, error in pipeline.failures:
+        print(f"[!] {stage} {key}: {error}")
+
+
+if __name__ == "__main__":
+    main()
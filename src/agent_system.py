@@ -1,65 +1,75 @@
+import os
+import copy
 import json
-import yfinance as yf
+import threading
 from datetime import datetime, timedelta
-from tavily import TavilyClient
 from evaluator import FinancialEvaluator
-from analytics import StockAnalyst 
+from analytics import StockAnalyst, HEAVY_MODULES, yf
+from lazy_loader import LazyEngine, warm_up
+from tracing import span, tracer
+from caching import LRUCache
+from noise_filter import NoiseClassifier
+from streaming import emit_stage
+
+def _build_researcher(api_key):
+    from tavily import TavilyClient
+    return TavilyClient(api_key=api_key)
 
 class FinbenchSystem:
-    def __init__(self, canonical_path, tavily_api_key):
-        self.lstm_engine = StockAnalyst() 
+    def __init__(self, canonical_path, tavily_api_key, audit_cache_size=256, noise_vocabulary=None):
+        # heavy engines load on first use, call warm_up() to load them in the background
+        self.lstm_engine = LazyEngine("lstm_engine", StockAnalyst)
         self.evaluator = FinancialEvaluator(canonical_path)
         self.tavily_api_key = tavily_api_key
-        self.researcher = TavilyClient(api_key=tavily_api_key) if tavily_api_key else None             
+        self.researcher = LazyEngine("researcher", lambda: _build_researcher(tavily_api_key)) if tavily_api_key else None
         self.evidence_weights = {
             "FUNDAMENTAL_DATA": 1.0,
             "PEER_CONTEXT": 0.5,
             "MARKET_NOISE": 0.0
         }
+        self.noise_classifier = NoiseClassifier(noise_vocabulary)
+        # ticker-level audit core, keyed by (ticker, day) so it rolls over at midnight
+        self._core_cache = LRUCache(maxsize=audit_cache_size, ttl=24 * 3600)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def warm_up(self):
+        return warm_up(self.lstm_engine, self.researcher, *HEAVY_MODULES)
 
     # input classifier
     def _epistemic_noise_filter(self, query):
-        speculative_noise = ['buy', 'sell', 'long', 'short', 'reco', 'advice', 'target']
-        sentiment_noise = ['bullish', 'bearish', 'hype', 'undervalued', 'overvalued', 'moon']
-        temporal_noise = ['surge', 'plunge', 'daily', 'news', 'rally', 'correction']
-        
-        all_noise = speculative_noise + sentiment_noise + temporal_noise
-        detected = [word for word in all_noise if word in query.lower()]
-        
-        return {
-            "is_noisy": len(detected) > 0,
-            "noise_elements": detected,
-            "action": "BLOCK_RECO" if any(w in speculative_noise for w in detected) else "IGNORE"
-        }
+        return self.noise_classifier.classify(query)
 
     def _get_deep_fundamentals(self, ticker):
-        try:
-            t = yf.Ticker(ticker)
-            bs = t.balance_sheet
-            is_stmt = t.income_stmt
+        with span("acquisition.fundamentals", ticker=ticker) as s:
+            try:
+                t = yf.Ticker(ticker)
+                bs = t.balance_sheet
+                is_stmt = t.income_stmt
             
-            def extract(df, keys):
-                if df is not None and not df.empty:
-                    for k in keys:
-                        if k in df.index: 
-                            val = df.loc[k].iloc[0]
-                            # CEK: Jika val adalah None atau NaN, kembalikan 0.0
-                            if val is None or str(val) == 'nan':
-                                return 0.0
-                            return float(val)
-                return 0.0 # Selalu kembalikan float 0.0 jika tidak ditemukan
-
-            return {
-                "revenue": extract(is_stmt, ['Total Revenue', 'TotalRevenue']),
-                "net_income": extract(is_stmt, ['Net Income', 'NetIncome']),
-                "total_assets": extract(bs, ['Total Assets', 'TotalAssets']),
-                "ppe_net": extract(bs, ['Net PPE', 'Property Plant Equipment Net']),
-                "inventory": extract(bs, ['Inventory']),
-                "total_liabilities": extract(bs, ['Total Liabilities Net Minority Interest', 'TotalLiabilities'])
-            }
-        except Exception as e:
-            print(f"[!] Acquisition Error: {e}")
-            return {}
+                def extract(df, keys):
+                    if df is not None and not df.empty:
+                        for k in keys:
+                            if k in df.index: 
+                                val = df.loc[k].iloc[0]
+                                # CEK: Jika val adalah None atau NaN, kembalikan 0.0
+                                if val is None or str(val) == 'nan':
+                                    return 0.0
+                                return float(val)
+                    return 0.0 # Selalu kembalikan float 0.0 jika tidak ditemukan
+
+                return {
+                    "revenue": extract(is_stmt, ['Total Revenue', 'TotalRevenue']),
+                    "net_income": extract(is_stmt, ['Net Income', 'NetIncome']),
+                    "total_assets": extract(bs, ['Total Assets', 'TotalAssets']),
+                    "ppe_net": extract(bs, ['Net PPE', 'Property Plant Equipment Net']),
+                    "inventory": extract(bs, ['Inventory']),
+                    "total_liabilities": extract(bs, ['Total Liabilities Net Minority Interest', 'TotalLiabilities'])
+                }
+            except Exception as e:
+                print(f"[!] Acquisition Error: {e}")
+                s.set(error=str(e))
+                return {}
 
     def _identify_business_archetype(self, ticker, fundamentals):
         rev = fundamentals.get("revenue")
@@ -110,16 +120,19 @@ class FinbenchSystem:
         sector_data = {"median_roa": 10.0, "median_turnover": 0.7, "status": "FALLBACK"}
         
         if self.researcher:
-            try:
-                # search ROA avg
-                t = yf.Ticker(ticker)
-                sector = t.info.get('sector', 'Technology')
-                query = f"average ROA and asset turnover for {sector} sector 2025"
-                search = self.researcher.search(query=query, max_results=1)
-                sector_data["search_context"] = search['results'][0]['content'] if search['results'] else ""
-                sector_data["sector_name"] = sector
-                sector_data["status"] = "LIVE_SEARCH_DATA"
-            except: pass
+            with span("retrieval.benchmarks", ticker=ticker) as s:
+                try:
+                    # search ROA avg
+                    t = yf.Ticker(ticker)
+                    sector = t.info.get('sector', 'Technology')
+                    query = f"average ROA and asset turnover for {sector} sector 2025"
+                    search = self.researcher.search(query=query, max_results=1)
+                    sector_data["search_context"] = search['results'][0]['content'] if search['results'] else ""
+                    sector_data["sector_name"] = sector
+                    sector_data["status"] = "LIVE_SEARCH_DATA"
+                except Exception as e:
+                    s.set(error=str(e))
+                s.set(status=sector_data["status"])
             
         return sector_data
     
@@ -142,25 +155,103 @@ class FinbenchSystem:
         }
 
     def run(self, ticker, query=""):
-        # running noise filter
+        with span("finbench.run", ticker=ticker) as s:
+            report = self._run(ticker, query)
+            s.set(blocked="error" in report)
+            return report
+
+    def _run(self, ticker, query):
+        # running noise filter, the only part of the audit that depends on the query
         noise_audit = self._epistemic_noise_filter(query)
-        
+        core = self._ticker_core(ticker)
+        if "error" in core:
+            return core
+        return self._query_overlay(ticker, core, noise_audit)
+
+    def _core_key(self, ticker):
+        return (ticker.upper(), datetime.now().strftime("%Y-%m-%d"))
+
+    def _ticker_core(self, ticker):
+        # shared by every session (the engine is a cache_resource), one compute per ticker per day
+        key = self._core_key(ticker)
+        core = self._core_cache.get(key)
+        if core is not None:
+            return self._replay_core(ticker, core)
+        with self._core_lock(key):
+            # another session may have filled it while we waited
+            core = self._core_cache.get(key)
+            if core is not None:
+                return self._replay_core(ticker, core)
+            core = self._build_core(ticker)
+            if "error" not in core:
+                self._core_cache.set(key, core)
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        return core
+
+    def _replay_core(self, ticker, core):
+        # no fetches on a hit, but streaming clients still see the stages
+        tracer.current().set(core_cache="hit")
+        emit_stage("fundamentals_ready", {"ticker": ticker, "fundamentals": core["fundamentals"], "cached": True})
+        emit_stage("structure_ready", {"ticker": ticker, "archetype": core["archetype"], "metrics": core["metrics"], "cached": True})
+        emit_stage("benchmarks_ready", {"ticker": ticker, "status": core["benchmarks"].get("status"), "cached": True})
+        if self.researcher:
+            emit_stage("narratives_ready", {"ticker": ticker, "count": len(core["narratives"]), "cached": True})
+        return core
+
+    def _core_lock(self, key):
+        # concurrent sessions asking for the same ticker wait for one fetch instead of racing
+        with self._inflight_lock:
+            return self._inflight.setdefault(key, threading.Lock())
+
+    def _build_core(self, ticker):
         # Data Acquisition
         raw_fund = self._get_deep_fundamentals(ticker)
         if not raw_fund or None in raw_fund.values():
             return {"error": f"Data Insufficient for {ticker}. Epistemic Block active."}
+        emit_stage("fundamentals_ready", {"ticker": ticker, "fundamentals": raw_fund})
 
         # Analyze structure
-        archetype = self._identify_business_archetype(ticker, raw_fund)
-        metrics = self._calculate_sovereign_metrics(raw_fund, archetype)
+        with span("analysis.structure"):
+            archetype = self._identify_business_archetype(ticker, raw_fund)
+            metrics = self._calculate_sovereign_metrics(raw_fund, archetype)
+        emit_stage("structure_ready", {"ticker": ticker, "archetype": archetype, "metrics": metrics})
         benchmarks = self._get_sector_benchmarks(ticker)
-        denom_audit = self._audit_denominator_integrity(raw_fund)
+        emit_stage("benchmarks_ready", {"ticker": ticker, "status": benchmarks.get("status")})
+        with span("analysis.denominator_audit"):
+            denom_audit = self._audit_denominator_integrity(raw_fund)
+
+        # Search Context only if funadmental is clean
+        narratives = []
+        if self.researcher:
+            with span("retrieval.narratives", ticker=ticker) as s:
+                try:
+                    search = self.researcher.search(query=f"{ticker} structural moat audit", max_results=2)
+                    narratives = [{"content": r['content'], "url": r.get('url'), "reliability": self.evidence_weights["PEER_CONTEXT"]} for r in search['results']]
+                except Exception as e:
+                    s.set(error=str(e))
+                s.set(results=len(narratives))
+            emit_stage("narratives_ready", {"ticker": ticker, "count": len(narratives)})
+
+        return {
+            "analysis_date": datetime.now().strftime("%Y-%m-%d"),
+            "fundamentals": raw_fund,
+            "archetype": archetype,
+            "metrics": metrics,
+            "benchmarks": benchmarks,
+            "denominator_audit": denom_audit,
+            "narratives": narratives,
+        }
+
+    def _query_overlay(self, ticker, core, noise_audit):
+        # cached core is shared, hand every caller its own copy
+        core = copy.deepcopy(core)
 
         # Governance & Decision Perimeter
         governance = {
             "epistemic_grade": "EVIDENCE_STRONG" if not noise_audit["is_noisy"] else "EVIDENCE_CONTAMINATED_BY_NOISE",
             "noise_filter_report": noise_audit,
-            "business_archetype": archetype,
+            "business_archetype": core["archetype"],
             "decision_perimeter": {
                 "allowed": ["ANALYZE_STRUCTURE", "AUDIT_INTEGRITY"],
                 "forbidden": ["BUY", "SELL", "RECO_DIRECTIONAL"],
@@ -169,25 +260,31 @@ class FinbenchSystem:
             "evidence_hierarchy_applied": self.evidence_weights
         }
 
-        # Search Context only if funadmental is clean
-        narratives = []
-        if self.researcher:
-            try:
-                search = self.researcher.search(query=f"{ticker} structural moat audit", max_results=2)
-                narratives = [{"content": r['content'], "url": r.get('url'), "reliability": self.evidence_weights["PEER_CONTEXT"]} for r in search['results']]
-            except: pass
-
         return {
-            "temporal": {"analysis_date": datetime.now().strftime("%Y-%m-%d")},
+            "temporal": {"analysis_date": core["analysis_date"]},
             "evidence_integrity": {
-                "ticker": ticker, 
+                "ticker": ticker,
                 "source_reliability": self.evidence_weights["FUNDAMENTAL_DATA"],
                 "noise_contamination": noise_audit["is_noisy"]
             },
-            "archetype_context": archetype,
-            "sovereign_metrics": metrics,
-            "denominator_audit": denom_audit,
-            "benchmarks": benchmarks,
+            "archetype_context": core["archetype"],
+            "sovereign_metrics": core["metrics"],
+            "denominator_audit": core["denominator_audit"],
+            "benchmarks": core["benchmarks"],
             "governance": governance,
-            "context_noise": narratives
+            "context_noise": core["narratives"]
         }
+
+    def audit_fingerprint(self):
+        # what the cached answers were grounded on: the day's audit cores and the canonical tables
+        try:
+            tables = os.stat(self.evaluator.canonical_dir).st_mtime_ns
+        except OSError:
+            tables = 0
+        return f"{datetime.now().strftime('%Y-%m-%d')}:{tables}"
+
+    def clear_audit_cache(self, ticker=None):
+        if ticker is None:
+            self._core_cache.clear()
+        else:
+            self._core_cache.pop(self._core_key(ticker))
@@ -1,20 +1,44 @@
 import os
+import time
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import warnings
-from sklearn.preprocessing import MinMaxScaler
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout, Input
 from datetime import datetime, timedelta
 
+try:
+    from .lazy_loader import lazy_module
+    from .tracing import span
+    from .streaming import emit_stage
+    from .price_store import PriceStore, yf
+except ImportError:
+    from lazy_loader import lazy_module
+    from tracing import span
+    from streaming import emit_stage
+    from price_store import PriceStore, yf
+
 # log and warning cleaning
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 warnings.filterwarnings('ignore')
 
+# heavy engines, imported on first use (or by a background warm-up)
+sk_preprocessing = lazy_module("sklearn.preprocessing", name="sklearn")
+keras_models = lazy_module("keras.models", name="keras")
+keras_layers = lazy_module("keras.layers", name="keras.layers")
+HEAVY_MODULES = (sk_preprocessing, keras_models, keras_layers, yf)
+
+# moves within half an ATR of the current price count as neutral
+NEUTRAL_BAND_ATR = 0.5
+
 class StockAnalyst:
-    def __init__(self):
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+    def __init__(self, price_store=None):
+        self._scaler = None
+        self.prices = price_store or PriceStore()
+
+    @property
+    def scaler(self):
+        if self._scaler is None:
+            self._scaler = sk_preprocessing.MinMaxScaler(feature_range=(0, 1))
+        return self._scaler
 
     def _get_market_config(self, ticker):
         # market index detection based on ticker (indonesia and global stocks)
@@ -22,8 +46,8 @@ class StockAnalyst:
             return "^JKSE", "IDR"
         else:
             return "^GSPC", "USD"
-    def get_explainable_forecast(self, ticker):
-        raw_forecast = self.forecast_price(ticker) # calling LSTM
+    def get_explainable_forecast(self, ticker, mode="point", latency_budget=None):
+        raw_forecast = self.forecast_price(ticker, mode=mode, latency_budget=latency_budget) # calling LSTM
         
         # Feature Attribution
         attributions = {
@@ -60,53 +84,108 @@ class StockAnalyst:
         
         return df.ffill().bfill()
 
-    def forecast_price(self, ticker, end_date=None):
+    def _build_windows(self, scaled_data, lookback=60):
+        # sliding lookback windows for the LSTM
+        X = []
+        for i in range(lookback, len(scaled_data)):
+            X.append(scaled_data[i-lookback:i, :])
+        return np.array(X)
+
+    def _sample_predictions(self, model, window, samples, latency_budget=None):
+        # MC dropout: dropout stays on and the window is repeated, so every row is one draw from a single batched call
+        batch = lambda n: np.asarray(model(np.repeat(window, n, axis=0), training=True))[:, 0]
+        start = time.perf_counter()
+        if latency_budget is None:
+            return batch(samples), time.perf_counter() - start
+
+        # small probe first, then a linear cost estimate (batching makes the real cost lower) sizes the rest
+        probe = min(8, samples)
+        draws = [batch(probe)]
+        per_sample = (time.perf_counter() - start) / probe
+        n = int(min(samples, max(probe, latency_budget / per_sample)))
+        if n > probe:
+            draws.append(batch(n - probe))
+        return np.concatenate(draws), time.perf_counter() - start
+
+    def _unscale_close(self, values, n_features):
+        dummy = np.zeros((len(values), n_features))
+        dummy[:, 0] = values
+        return self.scaler.inverse_transform(dummy)[:, 0]
+
+    def forecast_price(self, ticker, end_date=None, mode="point", samples=64, latency_budget=None):
+        # mode="mc_dropout" returns a sampled predictive distribution, latency_budget (seconds) caps the samples
+        with span("forecast.price", ticker=ticker, mode=mode) as s:
+            result = self._forecast_price(ticker, end_date, mode, samples, latency_budget)
+            if "error" in result:
+                s.set(error=result["error"])
+            else:
+                emit_stage("forecast_ready", {"ticker": ticker, "expected_mean_7d": result["forecast_engine"]["expected_mean_7d"]})
+            return result
+
+    def _forecast_price(self, ticker, end_date=None, mode="point", samples=64, latency_budget=None):
         try:
             # Data acquisition
             market_idx, currency = self._get_market_config(ticker)
             current_end = end_date if end_date else datetime.now().strftime('%Y-%m-%d')
             
-            stock_data = yf.Ticker(ticker).history(end=current_end, period="2y")
-            macro_data = yf.Ticker(market_idx).history(end=current_end, period="2y")['Close']
+            # stock bars already aligned with the index calendar, only new bars are fetched
+            with span("acquisition.prices", ticker=ticker, benchmark=market_idx) as s:
+                stock_data = self.prices.aligned(ticker, market_idx, end=current_end)
+                s.set(rows=len(stock_data))
             
             if stock_data.empty: return {"error": f"Ticker {ticker} tidak ditemukan."}
 
-            # Data alignment
-            df = self._calculate_indicators(stock_data)
-            df = df.join(pd.DataFrame({'MARKET_INDEX': macro_data}), how='left')
-            df['MARKET_INDEX'] = df['MARKET_INDEX'].ffill().bfill() # Sinkronisasi kalender bursa
+            with span("forecast.indicators"):
+                df = self._calculate_indicators(stock_data)
 
             # forecast engine using LSTM
             features = ['Close', 'RSI', 'MACD', 'ATR', 'MARKET_INDEX']
             scaled_data = self.scaler.fit_transform(df[features])
 
-            X = []
-            for i in range(60, len(scaled_data)):
-                X.append(scaled_data[i-60:i, :])
-            X = np.array(X)
-
-            model = Sequential([
-                Input(shape=(60, len(features))),
-                LSTM(64, return_sequences=True),
-                Dropout(0.2),
-                LSTM(32),
-                Dense(1)
+            X = self._build_windows(scaled_data)
+
+            model = keras_models.Sequential([
+                keras_layers.Input(shape=(60, len(features))),
+                keras_layers.LSTM(64, return_sequences=True),
+                keras_layers.Dropout(0.2),
+                keras_layers.LSTM(32),
+                keras_layers.Dense(1)
             ])
-            model.compile(optimizer='adam', loss='mse')
-            model.fit(X, scaled_data[60:, 0], epochs=12, batch_size=32, verbose=0)
+            with span("model.fit", samples=len(X)):
+                model.compile(optimizer='adam', loss='mse')
+                model.fit(X, scaled_data[60:, 0], epochs=12, batch_size=32, verbose=0)
 
             # Expected Mean Calculation
             last_60 = scaled_data[-60:].reshape(1, 60, len(features))
-            raw_pred = model.predict(last_60, verbose=0)[0,0]
-            
-            dummy = np.zeros((1, len(features)))
-            dummy[0, 0] = raw_pred
-            expected_mean = self.scaler.inverse_transform(dummy)[0,0]
+            with span("model.predict"):
+                start = time.perf_counter()
+                raw_pred = model.predict(last_60, verbose=0)[0,0]
+                point_s = time.perf_counter() - start
+            expected_mean = self._unscale_close([raw_pred], len(features))[0]
 
             # Strategic calculation
             current_price = df['Close'].iloc[-1]
             atr = df['ATR'].iloc[-1]
             market_trend = df['MARKET_INDEX'].pct_change(5).iloc[-1]
+
+            distribution = None
+            if mode == "mc_dropout":
+                with span("model.sample") as ps:
+                    draws, sample_s = self._sample_predictions(model, last_60, samples, latency_budget)
+                    ps.set(samples=len(draws), cost_vs_point=round(sample_s / (point_s + 1e-9), 2))
+                prices = self._unscale_close(draws, len(features))
+                expected_mean = float(prices.mean())
+                band = NEUTRAL_BAND_ATR * atr
+                bull = float((prices > current_price + band).mean())
+                bear = float((prices < current_price - band).mean())
+                distribution = {
+                    "method": "mc_dropout",
+                    "samples": len(prices),
+                    "std": round(float(prices.std()), 2),
+                    "quantiles": {q: round(float(v), 2) for q, v in zip(("p10", "p50", "p90"), np.percentile(prices, [10, 50, 90]))},
+                    "latency_ms": round(sample_s * 1000, 1),
+                    "cost_vs_point": round(sample_s / (point_s + 1e-9), 2)
+                }
             
             bull_obj = expected_mean + (1.5 * atr)
             bear_obj = expected_mean - (1.5 * atr)
@@ -117,7 +196,9 @@ class StockAnalyst:
             edge_ratio = round(upside / (downside + 1e-9), 2)
 
             # Probability Assignment
-            if market_trend > 0 and expected_mean > current_price:
+            if distribution is not None:
+                probs = {"bull": round(bull, 2), "neutral": round(1 - bull - bear, 2), "bear": round(bear, 2)}
+            elif market_trend > 0 and expected_mean > current_price:
                 probs = {"bull": 0.50, "neutral": 0.30, "bear": 0.20}
             elif market_trend < 0:
                 probs = {"bull": 0.20, "neutral": 0.35, "bear": 0.45}
@@ -138,6 +219,7 @@ class StockAnalyst:
                 "forecast_engine": {
                     "expected_mean_7d": round(expected_mean, 2),
                     "probabilities": probs,
+                    "distribution": distribution,
                     "scenarios": {
                         "bullish_objective": round(bull_obj, 2),
                         "bearish_objective": round(bear_obj, 2)
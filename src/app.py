@@ -5,6 +5,12 @@ import json
 from datetime import datetime
 from bridge_llama import SovereignLlamaBridge, DEFAULT_CONFIG
 from agent_system import FinbenchSystem
+from lazy_loader import startup_report
+from tracing import tracer
+from streaming import AuditStream, STAGE_LABELS
+from conversation import ConversationContext
+from llm_gateway import LLMGateway, is_rate_limited
+from concurrent.futures import ThreadPoolExecutor
 
 # UI configuraton
 st.set_page_config(
@@ -137,6 +143,9 @@ st.markdown("""
 # system intialization
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+# what actually goes to the model: bounded, independent of session length
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationContext()
 
 @st.cache_resource
 def init_core():
@@ -145,10 +154,23 @@ def init_core():
         canonical_path=DEFAULT_CONFIG["CANONICAL_PATH"],
         tavily_api_key=DEFAULT_CONFIG["TAVILY_API_KEY"]
     )
-    return SovereignLlamaBridge(engine)
+    # LSTM, researcher and market data clients load in the background while the page renders
+    engine.warm_up()
+    # FINBENCH_TRACE turns on span export, FINBENCH_METRICS_PORT exposes /metrics for prometheus
+    if os.environ.get("FINBENCH_METRICS_PORT"):
+        if not tracer.enabled:
+            tracer.enable(os.environ.get("FINBENCH_TRACE"))
+        tracer.serve_metrics(int(os.environ["FINBENCH_METRICS_PORT"]))
+    # identical questions across sessions are answered from cache, misses are queued with rate-limit backoff
+    return LLMGateway(SovereignLlamaBridge(engine), fingerprint=engine.audit_fingerprint)
 
 bridge = init_core()
 
+@st.cache_resource
+def get_audit_executor():
+    # one pool for every session, audits never block the streamlit script thread
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="audit")
+
 def clean_output(text):
     def replace_headers(match):
         return f"### {match.group(1).replace('_', ' ').title()}"
@@ -187,9 +209,14 @@ with st.sidebar:
         4. **Falsifiability**
         """)
 
+    with st.expander("⏱️ STARTUP PROFILE", expanded=False):
+        for row in startup_report():
+            st.caption(f"{row['component']}: {row['seconds']:.2f}s ({row['status']})")
+
     st.markdown("---")
     if st.button("New Audit Session", use_container_width=True):
         st.session_state.chat_history = []
+        st.session_state.conversation = ConversationContext()
         st.rerun()
 
 landing_placeholder = st.empty()
@@ -268,41 +295,59 @@ query = st.chat_input("Enter ticker or question...")
 if query:
     landing_placeholder.empty() 
     st.session_state.chat_history.append({"role": "user", "content": query})
+    st.session_state.conversation.add("user", query)
     
     with chat_container:
         with st.chat_message("user"):
             st.markdown(query)
             
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing..."):
-                try:
-                    history_str = "\n".join([f"{m['role'].upper()}: {m['content']}" for m in st.session_state.chat_history])
-                    result = bridge.smart_query(history_str)
+            status = st.status("Analyzing...", expanded=False)
+            answer_slot = st.empty()
+            try:
+                history_str = st.session_state.conversation.build()
+                # token streaming when the bridge supports it, otherwise the blocking call runs off the script thread
+                query_fn = bridge.stream_query if hasattr(bridge.backend, "stream_query") else bridge.smart_query
+                stream = AuditStream(get_audit_executor(), query_fn, history_str)
 
-                    if isinstance(result, dict):
-                        answer = result.get("answer", "")
-                        # Ambil sources, tapi langsung kosongkan jika terdeteksi error limit
-                        error_keywords = ["token has reached", "Rate Limit", "PRECISION LOCK"]
-                        is_rate_limited = any(word.upper() in answer.upper() for word in error_keywords)
-                        
-                        sources = [] if is_rate_limited else result.get("sources", [])
-                    else:
-                        answer = result
-                        sources = []
+                def render_stream():
+                    streamed = False
+                    for kind, value, payload in stream:
+                        if kind == "stage":
+                            status.write(f"✓ {STAGE_LABELS.get(value, value)}")
+                        elif kind == "token":
+                            streamed = True
+                            yield value
+                        elif kind == "result" and not streamed:
+                            yield value.get("answer", "") if isinstance(value, dict) else str(value)
 
-                    st.markdown(clean_output(answer))
-                    
-                    if sources: 
-                        with st.expander("📚 Audit Sources & Evidence", expanded=True):
-                            for src in sources:
-                                st.markdown(f"○ {src}")
+                streamed_text = answer_slot.write_stream(render_stream())
+                result = stream.result if stream.result is not None else streamed_text
+
+                if isinstance(result, dict):
+                    answer = result.get("answer", "")
+                    # Ambil sources, tapi langsung kosongkan jika terdeteksi error limit
+                    sources = [] if is_rate_limited(answer) else result.get("sources", [])
+                else:
+                    answer = result if isinstance(result, str) else "".join(map(str, result))
+                    sources = []
+
+                answer_slot.markdown(clean_output(answer))
+                status.update(label="Audit complete", state="complete")
+                
+                if sources: 
+                    with st.expander("📚 Audit Sources & Evidence", expanded=True):
+                        for src in sources:
+                            st.markdown(f"○ {src}")
 
-                    # Simpan ke history (Data yang disimpan sudah bersih dari sources jika error)
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": answer,
-                        "sources": sources
-                    })
-                    
-                except Exception as e:
-                    st.error(f"Audit Session Error: {str(e)}")
\ No newline at end of file
+                # Simpan ke history (Data yang disimpan sudah bersih dari sources jika error)
+                st.session_state.chat_history.append({
+                    "role": "assistant", 
+                    "content": answer,
+                    "sources": sources
+                })
+                st.session_state.conversation.add("assistant", answer, result=result)
+                
+            except Exception as e:
+                status.update(label="Audit failed", state="error")
+                st.error(f"Audit Session Error: {str(e)}")
@@ -0,0 +1,163 @@
+import numpy as np
+
+try:
+    from .dataset import FinanceBenchDataset
+except ImportError:
+    from dataset import FinanceBenchDataset
+
+METRICS = ["revenue", "net_income", "assets", "liabilities"]
+
+
+def validate_arrays(observed, currency_unknown):
+    # observed: (n, 4) float matrix in METRICS order, currency_unknown: (n,) bool
+    rev, ni, assets, liab = observed[:, 0], observed[:, 1], observed[:, 2], observed[:, 3]
+
+    has_margin = (rev != 0) & (ni != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        net_margin = np.where(has_margin, ni / np.where(rev != 0, rev, 1.0), np.nan)
+
+    # Calculate Equity and Prove Accounting Identity
+    equity = np.round(assets - liab, 2)
+    collision = (assets == liab) & (assets != 0)
+    identity = (assets != 0) & (liab != 0) & (np.abs(assets - (liab + equity)) < 1.0)
+    identity_failure = ~identity & (assets != 0)
+
+    # scoring, same deductions as the scalar path
+    completeness = (observed != 0).sum(axis=1) / 4
+    sanity = 1.0 - 0.8 * collision - 0.4 * identity_failure - 0.2 * currency_unknown
+    sanity = np.maximum(0.1, np.round(sanity, 2))
+
+    return {
+        "net_margin": net_margin,
+        "has_margin": has_margin,
+        "equity": equity,
+        "collision": collision,
+        "identity": identity,
+        "identity_failure": identity_failure,
+        "completeness": completeness,
+        "sanity": sanity,
+        "passed": (sanity > 0.6) & ~collision,
+        "safe_to_reason": (completeness >= 0.75) & (sanity >= 0.6),
+    }
+
+
+def sector_outliers(net_margin, sectors, threshold=3.5, min_peers=5):
+    # robust z-score (median / MAD) of net margin inside each sector
+    z = np.full(len(net_margin), np.nan)
+    bands = {}
+    sectors = np.asarray(sectors, dtype=object)
+    valid = ~np.isnan(net_margin) & (sectors != None)  # noqa: E711
+    for sector in set(sectors[valid]):
+        idx = np.flatnonzero(valid & (sectors == sector))
+        if len(idx) < min_peers:
+            continue
+        values = net_margin[idx]
+        median = np.median(values)
+        mad = np.median(np.abs(values - median))
+        if mad == 0:
+            continue
+        z[idx] = 0.6745 * (values - median) / mad
+        bands[sector] = (median, mad)
+    return np.abs(z) > threshold, z, bands
+
+
+def validate_batch(company_ids, raws, sectors=None, outlier_threshold=3.5):
+    # raws are FinancialEvaluator._get_metrics outputs, one per company id
+    n = len(raws)
+    observed = np.zeros((n, len(METRICS)))
+    currency_unknown = np.zeros(n, dtype=bool)
+    for i, raw in enumerate(raws):
+        obs = raw["observed"]
+        observed[i] = [obs[m]["value"] for m in METRICS]
+        currency_unknown[i] = raw["metadata"]["currency"] == "Unknown"
+
+    cols = validate_arrays(observed, currency_unknown)
+
+    reports = []
+    for i, (company_id, raw) in enumerate(zip(company_ids, raws)):
+        obs = raw["observed"]
+        collision = bool(cols["collision"][i])
+        identity = bool(cols["identity"][i])
+        sanity_score = float(cols["sanity"][i])
+        completeness = float(cols["completeness"][i])
+
+        inferred = {}
+        if cols["has_margin"][i]:
+            inferred["net_margin"] = {
+                "value": round(float(cols["net_margin"][i]), 4),
+                "method": "deduced_from_observed",
+                "formula": "net_income / revenue"
+            }
+
+        anomalies = []
+        if collision:
+            anomalies.append({"type": "data_collision", "severity": "CRITICAL", "rationale": "Assets == Liabilities detected."})
+
+        reports.append({
+            "entity": company_id.split('_')[0] if company_id else "UNKNOWN",
+            "period": company_id.split('_')[1] if '_' in company_id else "UNKNOWN",
+            "knowledge_base": {
+                "observed": obs,
+                "inferred": inferred,
+                "accounting_proof": {
+                    "equity_deduced": round(float(observed[i, 2] - observed[i, 3]), 2) if not collision else "UNRELIABLE",
+                    "identity_verified": identity
+                }
+            },
+            "epistemic_status": {
+                "completeness": completeness,
+                "sanity_score": sanity_score,
+                "data_integrity": "PASSED" if cols["passed"][i] else "FAILED"
+            },
+            "anomalies": anomalies,
+            "llm_semantic_contract": {
+                "safe_to_reason": bool(cols["safe_to_reason"][i]),
+                "reasoning_mode": "deductive" if identity else "investigative",
+                "known_unknowns": [k for k, v in obs.items() if v["value"] == 0],
+                "caution_note": "Identity failure detected" if cols["identity_failure"][i] else None
+            },
+            "metadata": raw["metadata"]
+        })
+
+    if sectors is not None:
+        flag_sector_outliers(company_ids, reports, sectors, outlier_threshold, net_margin=cols["net_margin"])
+    return reports
+
+
+def flag_sector_outliers(company_ids, reports, sectors, threshold=3.5, net_margin=None):
+    # (re)applies the sector_outlier anomaly in place, returns the indices whose flag changed
+    if net_margin is None:
+        # recomputed from the observed values, the inferred margin in the report is rounded
+        observed = np.array([[r["knowledge_base"]["observed"][m]["value"] for m in METRICS[:2]] for r in reports], dtype=float).reshape(-1, 2)
+        rev, ni = observed[:, 0], observed[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            net_margin = np.where((rev != 0) & (ni != 0), ni / np.where(rev != 0, rev, 1.0), np.nan)
+    row_sectors = [sectors.get(cid.split('_')[0].upper()) for cid in company_ids]
+    is_outlier, z, bands = sector_outliers(net_margin, row_sectors, threshold)
+
+    changed = []
+    for i, report in enumerate(reports):
+        before = [a for a in report["anomalies"] if a["type"] == "sector_outlier"]
+        after = []
+        if is_outlier[i]:
+            sector = row_sectors[i]
+            median = bands[sector][0]
+            after.append({
+                "type": "sector_outlier",
+                "severity": "WARNING",
+                "rationale": f"Net margin {net_margin[i]:.2%} is out of band for {sector} (median {median:.2%}, robust z {z[i]:.1f})."
+            })
+        if before != after:
+            report["anomalies"] = [a for a in report["anomalies"] if a["type"] != "sector_outlier"] + after
+            changed.append(i)
+    return changed
+
+
+def load_sectors(dataset_path):
+    # ENTITY -> gics_sector from the FinanceBench jsonl, only the two columns are read
+    table = FinanceBenchDataset(dataset_path).table(["doc_name", "gics_sector"])
+    sectors = {}
+    for doc_name, sector in zip(table["doc_name"].to_pylist(), table["gics_sector"].to_pylist()):
+        if doc_name and sector:
+            sectors[doc_name.split('_')[0].upper()] = sector
+    return sectors
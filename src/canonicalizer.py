@@ -6,12 +6,24 @@ import json
 import os
 from pathlib import Path
 
+try:
+    from .tracing import span
+    from .units import detect_context, dominant
+    from .table_index import ContentIndex, content_hash
+except ImportError:
+    from tracing import span
+    from units import detect_context, dominant
+    from table_index import ContentIndex, content_hash
+
 class FinancialCanonicalizer:
     def __init__(self):
         # celaning strange symbol and char
         self.clean_regex = re.compile(r'[^\d\.\(\)\-]')
         # emergency keywords for financial tabels detection
         self.emergency_keywords = ['revenue', 'income', 'asset', 'profit', 'loss', 'cash', 'tax', 'sales', 'operating', 'net', 'ebitda']
+        self.null_tokens = {'-', '', '_', 'none', 'þ', '¨', 'n/a', 'nil', '.'}
+        # parsed value per raw cell text, filings repeat '$', '-', years etc. constantly
+        self._cell_memo = {}
 
     def clean_cell(self, val):
         # handling nan values
@@ -28,9 +40,12 @@ class FinancialCanonicalizer:
         except:
             pass
 
+        return self._parse_cell(str(val))
+
+    def _parse_cell(self, raw):
         # Teks Normalization
-        s = str(val).strip().lower()
-        if s in ['-', '', '_', 'none', 'þ', '¨', 'n/a', 'nil', '.']: 
+        s = raw.strip().lower()
+        if s in self.null_tokens: 
             return 0.0
         
         # percentage detection
@@ -50,7 +65,15 @@ class FinancialCanonicalizer:
             num = float(clean)
             return num / 100 if is_percent else num
         except:
-            return str(val).strip()
+            return raw.strip()
+
+    def _typed_cell(self, raw):
+        val = self._cell_memo.get(raw)
+        if val is None:
+            if len(self._cell_memo) > 200000:
+                self._cell_memo.clear()
+            val = self._cell_memo[raw] = self._parse_cell(raw)
+        return val
 
     def is_high_quality(self, df):
         # filtering tabels
@@ -69,7 +92,14 @@ class FinancialCanonicalizer:
         def check_num(x):
             return isinstance(x, (int, float)) and x != 0.0
         
-        num_count = df.map(check_num).sum().sum()
+        # typed float columns are counted without touching python objects
+        num_count = 0
+        for col_idx in range(df.shape[1]):
+            col = df.iloc[:, col_idx]
+            if col.dtype == np.float64:
+                num_count += int(np.count_nonzero(col.to_numpy()))
+            else:
+                num_count += int(col.map(check_num).sum())
         density = num_count / df.size if df.size > 0 else 0
 
         # search financial keywords
@@ -100,7 +130,60 @@ class FinancialCanonicalizer:
         df.columns = [str(c).strip() if c else f"Col_{i}" for i, c in enumerate(df.iloc[0])]
         return df.iloc[1:].reset_index(drop=True)
 
+    def parse_markdown_table_typed(self, md_content):
+        # single pass: tokenize pipe rows, drop the separator, clean + type every cell on the way.
+        # fully numeric columns come out as float64, anything else (the label column) stays object
+        header = None
+        columns = []
+        is_numeric = []
+        n_rows = 0
+        for line in md_content.strip().split('\n'):
+            if '|' not in line:
+                continue
+            cells = [c.strip() for c in line.strip().strip('|').split('|')]
+            # ignor separator row
+            if all(set(c) <= {'-', ':', ' '} for c in cells):
+                continue
+            if header is None:
+                header = cells
+                continue
+
+            # short rows are padded like pd.DataFrame would (None -> 0.0 after cleaning)
+            while len(columns) < len(cells):
+                columns.append([0.0] * n_rows)
+                is_numeric.append(True)
+            for j, cell in enumerate(cells):
+                val = self._typed_cell(cell)
+                columns[j].append(val)
+                if is_numeric[j] and val.__class__ is not float:
+                    is_numeric[j] = False
+            for j in range(len(cells), len(columns)):
+                columns[j].append(0.0)
+            n_rows += 1
+
+        if n_rows == 0: return None
+
+        n_cols = max(len(header), len(columns))
+        data = {}
+        for j in range(n_cols):
+            if j >= len(columns):
+                data[j] = np.zeros(n_rows, dtype=np.float64)
+            elif is_numeric[j]:
+                data[j] = np.array(columns[j], dtype=np.float64)
+            else:
+                data[j] = np.array(columns[j], dtype=object)
+
+        df = pd.DataFrame(data, copy=False)
+        df.columns = [header[j] if j < len(header) and header[j] else f"Col_{j}" for j in range(n_cols)]
+        return df
+
     def process_file(self, json_path, output_dir):
+        with span("canonicalize.file", file=os.path.basename(json_path)) as s:
+            count = self._process_file(json_path, output_dir)
+            s.set(tables=count)
+            return count
+
+    def _process_file(self, json_path, output_dir):
         # processing json files
         if not os.path.exists(json_path): return 0
         
@@ -112,15 +195,75 @@ class FinancialCanonicalizer:
             return 0
         
         count = 0
+        tables = {}
+        contexts = {}
+        preceding_text = ""
         for item in data:
-            if item.get('type') == 'table':
-                df = self.parse_markdown_table(item['content'])
+            if item.get('type') == 'text':
+                preceding_text = item.get('content', '')
+            elif item.get('type') == 'table':
+                df = self.parse_markdown_table_typed(item['content'])
                 if df is not None:
-                    df = df.map(self.clean_cell)
-                    
                     if self.is_high_quality(df):
                         file_id = item['id']
-                        output_file = Path(output_dir) / f"{file_id}.csv"
-                        df.to_csv(output_file, index=False)
+                        tables[file_id] = df
                         count += 1
+                        # scale and currency come from the header row, the caption above the table and the first rows
+                        lines = [l for l in item['content'].strip().split('\n') if '|' in l]
+                        header_text = lines[0] if lines else ""
+                        rows_text = "\n".join(l for l in lines[1:4] if not set(l.replace('|', '')) <= {'-', ':', ' '})
+                        unit, currency = detect_context(header_text, preceding_text, rows_text)
+                        contexts[file_id] = {"unit": unit, "currency": currency, "content_hash": content_hash(df)}
+
+        filing = next(iter(contexts)).rsplit('_', 1)[0] if contexts else Path(json_path).stem.replace("_decomposed", "")
+        self._store_tables(output_dir, filing, tables, contexts)
         return count
+
+    def _store_tables(self, output_dir, filing, tables, contexts):
+        # each distinct table content is written once, repeats only get a reference in the sidecar
+        sidecar_path = Path(output_dir) / f"{filing}.tables.json"
+        try:
+            with open(sidecar_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f).get("tables", {})
+        except (OSError, ValueError):
+            previous = {}
+
+        with ContentIndex(output_dir).locked() as index:
+            for table_id, ctx in previous.items():
+                digest = ctx.get("content_hash")
+                if digest and (table_id not in contexts or contexts[table_id]["content_hash"] != digest):
+                    index.release(digest, table_id)
+
+            for table_id, df in tables.items():
+                ctx = contexts[table_id]
+                ctx["stored_as"] = index.register(ctx["content_hash"], table_id)
+                if ctx["stored_as"] == table_id:
+                    df.to_csv(Path(output_dir) / f"{table_id}.csv", index=False)
+
+            # csvs of this filing that now duplicate another table (or are gone) are dropped
+            owned = index.owned()
+            for table_id in set(previous) | set(contexts):
+                path = Path(output_dir) / f"{table_id}.csv"
+                if table_id not in owned and path.exists():
+                    path.unlink()
+
+            if contexts:
+                self.write_table_context(output_dir, contexts)
+            elif sidecar_path.exists():
+                sidecar_path.unlink()
+
+    def write_table_context(self, output_dir, contexts):
+        # per-filing sidecar read by the evaluator instead of re-sniffing every table
+        filing = next(iter(contexts)).rsplit('_', 1)[0]
+        sidecar = {
+            "filing": filing,
+            "default_unit": dominant(c["unit"] for c in contexts.values()),
+            "default_currency": dominant(c["currency"] for c in contexts.values()),
+            "tables": contexts
+        }
+        # written aside and swapped in, the evaluator may read it while another filing is being stored
+        path = Path(output_dir) / f"{filing}.tables.json"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, indent=4)
+        os.replace(tmp, path)
@@ -0,0 +1,101 @@
+import re
+
+# tickers are short upper-case words, these are the finance acronyms that look like them
+_TICKER_PATTERN = re.compile(r'\$?\b([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\b')
+_NOT_TICKERS = {
+    "I", "A", "AI", "ROA", "ROE", "ROI", "ROIC", "EPS", "PE", "PB", "EV", "EBIT", "EBITDA", "CEO", "CFO",
+    "USD", "IDR", "EUR", "US", "USA", "GDP", "IPO", "ETF", "LLM", "RND", "PPE", "CAPEX", "FCF", "YOY",
+    "QOQ", "TTM", "FY", "Q", "OK", "IS", "IT", "OR", "AND", "THE", "SEC", "GAAP", "IFRS", "ESG", "BUY", "SELL",
+}
+_STRUCTURED_KEYS = ("archetype_context", "sovereign_metrics", "denominator_audit")
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def _gist(role, content, limit=160):
+    first = re.split(r'(?<=[.!?])\s', content.strip(), maxsplit=1)[0]
+    first = re.sub(r'\s+', ' ', first)
+    if len(first) > limit:
+        first = first[:limit].rstrip() + "..."
+    return f"{role.upper()}: {first}"
+
+
+class ConversationContext:
+    # bounded prompt: compact audit state + cached summary of old turns + recent turns verbatim
+    def __init__(self, token_budget=1500, summary_budget=300, min_recent_turns=2):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_recent_turns = min_recent_turns
+        self.turns = []
+        self._summary_lines = []
+        self._summarized_upto = 0
+        self.tickers = []
+        self.last_metrics = {}
+
+    def add(self, role, content, result=None):
+        self.turns.append((role, content))
+        if role == "user":
+            for ticker in _TICKER_PATTERN.findall(content):
+                if ticker not in _NOT_TICKERS and ticker not in self.tickers:
+                    self.tickers.append(ticker)
+            self.tickers = self.tickers[-8:]
+        if isinstance(result, dict):
+            self._record_audit(result)
+
+    def _record_audit(self, result):
+        audit = result.get("audit_data") if isinstance(result.get("audit_data"), dict) else result
+        ticker = (audit.get("evidence_integrity") or {}).get("ticker")
+        metrics = {k: audit[k] for k in _STRUCTURED_KEYS if audit.get(k)}
+        if metrics:
+            self.last_metrics = {"ticker": ticker, **metrics} if ticker else metrics
+
+    def _fold(self, upto):
+        # only turns that just aged out get summarized, the existing prefix is reused as is
+        for role, content in self.turns[self._summarized_upto:upto]:
+            self._summary_lines.append(_gist(role, content))
+        self._summarized_upto = max(self._summarized_upto, upto)
+        while len(self._summary_lines) > 1 and estimate_tokens("\n".join(self._summary_lines)) > self.summary_budget:
+            self._summary_lines.pop(0)
+
+    def _state_block(self):
+        lines = []
+        if self.tickers:
+            lines.append(f"TICKERS DISCUSSED: {', '.join(self.tickers)}")
+        if self.last_metrics:
+            compact = "; ".join(f"{k}={v}" for k, v in self.last_metrics.items())
+            lines.append(f"LAST AUDIT: {compact}")
+        return "[AUDIT STATE]\n" + "\n".join(lines) if lines else ""
+
+    def build(self):
+        state = self._state_block()
+        budget = self.token_budget - estimate_tokens(state) - self.summary_budget
+
+        # newest turns first until the budget is spent
+        start = len(self.turns)
+        used = 0
+        while start > self._summarized_upto:
+            role, content = self.turns[start - 1]
+            cost = estimate_tokens(f"{role.upper()}: {content}")
+            if used + cost > budget and len(self.turns) - start >= self.min_recent_turns:
+                break
+            used += cost
+            start -= 1
+        if start > self._summarized_upto:
+            self._fold(start)
+
+        recent = []
+        for role, content in self.turns[start:]:
+            line = f"{role.upper()}: {content}"
+            # a single huge turn is cut rather than blowing the budget
+            if estimate_tokens(line) > budget:
+                line = line[:max(budget, 50) * 4] + " [...]"
+            recent.append(line)
+
+        parts = [state] if state else []
+        if self._summary_lines:
+            parts.append("[EARLIER CONVERSATION]\n" + "\n".join(self._summary_lines))
+        parts.append("\n".join(recent))
+        return "\n\n".join(parts)
@@ -0,0 +1,137 @@
+import os
+import json
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# one row per evidence item, the full pages are only read when asked for by financebench_id
+EVIDENCE_SCHEMA = pa.schema([
+    ("financebench_id", pa.string()),
+    ("evidence_index", pa.int32()),
+    ("doc_name", pa.string()),
+    ("evidence_page_num", pa.int64()),
+    ("evidence_text", pa.string()),
+    ("evidence_text_full_page", pa.string()),
+])
+EVIDENCE_ROW_GROUP = 64
+BATCH_ROWS = 512
+
+
+class FinanceBenchDataset:
+    # questions.parquet holds every scalar column, evidence.parquet the evidence pages, converted once from the jsonl
+    def __init__(self, jsonl_path, store_dir=None):
+        self.jsonl_path = jsonl_path
+        stem = os.path.splitext(os.path.basename(jsonl_path))[0]
+        self.store_dir = store_dir or os.path.join(os.path.dirname(os.path.abspath(jsonl_path)), f"{stem}.parquet")
+        self.questions_path = os.path.join(self.store_dir, "questions.parquet")
+        self.evidence_path = os.path.join(self.store_dir, "evidence.parquet")
+        self._lock = threading.Lock()
+        self._evidence_offsets = None
+        self._evidence_file = None
+
+    def _source_key(self):
+        st = os.stat(self.jsonl_path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def _is_current(self):
+        if not (os.path.exists(self.questions_path) and os.path.exists(self.evidence_path)):
+            return False
+        meta = pq.read_schema(self.questions_path).metadata or {}
+        return json.loads(meta.get(b"finbench_source", b"{}")) == self._source_key()
+
+    def ensure(self):
+        with self._lock:
+            if not self._is_current():
+                self._convert()
+        return self
+
+    def _convert(self):
+        # streamed, so only one batch of evidence pages is in memory at a time
+        os.makedirs(self.store_dir, exist_ok=True)
+        question_tables = []
+        rows, evidence = [], {name: [] for name in EVIDENCE_SCHEMA.names}
+        evidence_row = 0
+        evidence_tmp = self.evidence_path + ".tmp"
+        writer = pq.ParquetWriter(evidence_tmp, EVIDENCE_SCHEMA)
+
+        def flush(final=False):
+            if rows:
+                question_tables.append(pa.Table.from_pylist(rows))
+                rows.clear()
+            # only whole row groups until the end, so evidence row n always sits in group n // EVIDENCE_ROW_GROUP
+            n = len(evidence["financebench_id"])
+            n = n if final else n - n % EVIDENCE_ROW_GROUP
+            if n:
+                writer.write_table(pa.table({k: v[:n] for k, v in evidence.items()}, schema=EVIDENCE_SCHEMA), row_group_size=EVIDENCE_ROW_GROUP)
+                for values in evidence.values():
+                    del values[:n]
+
+        try:
+            with open(self.jsonl_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    items = record.pop("evidence", None) or []
+                    record["evidence_row"] = evidence_row
+                    record["evidence_count"] = len(items)
+                    for i, item in enumerate(items):
+                        evidence["financebench_id"].append(record.get("financebench_id"))
+                        evidence["evidence_index"].append(i)
+                        for name in EVIDENCE_SCHEMA.names[2:]:
+                            evidence[name].append(item.get(name))
+                    evidence_row += len(items)
+                    rows.append(record)
+                    if len(rows) >= BATCH_ROWS:
+                        flush()
+                flush(final=True)
+        finally:
+            writer.close()
+
+        # question metadata is small, batches are unified so a column that is null in one batch still types cleanly
+        questions = pa.concat_tables(question_tables, promote_options="permissive") if question_tables else pa.table({})
+        questions = questions.replace_schema_metadata({b"finbench_source": json.dumps(self._source_key()).encode()})
+        questions_tmp = self.questions_path + ".tmp"
+        pq.write_table(questions, questions_tmp)
+        os.replace(evidence_tmp, self.evidence_path)
+        os.replace(questions_tmp, self.questions_path)
+        self._evidence_offsets = None
+        self._evidence_file = None
+
+    # projection
+    def columns(self):
+        self.ensure()
+        return pq.read_schema(self.questions_path).names
+
+    def table(self, columns=None, filters=None):
+        # filters use pyarrow's form, e.g. [("question_type", "==", "metrics-generated")]
+        self.ensure()
+        return pq.read_table(self.questions_path, columns=columns, filters=filters, memory_map=True)
+
+    def load(self, columns=None, filters=None):
+        return self.table(columns, filters).to_pandas()
+
+    # evidence on demand
+    def _offsets(self):
+        if self._evidence_offsets is None:
+            index = self.table(["financebench_id", "evidence_row", "evidence_count"]).to_pydict()
+            self._evidence_offsets = {
+                fid: (row, count) for fid, row, count in zip(index["financebench_id"], index["evidence_row"], index["evidence_count"])
+            }
+            self._evidence_file = pq.ParquetFile(self.evidence_path, memory_map=True)
+        return self._evidence_offsets
+
+    def evidence(self, financebench_id, full_page=True):
+        # reads only the row groups that hold this question's evidence
+        location = self._offsets().get(financebench_id)
+        if location is None:
+            raise KeyError(financebench_id)
+        start, count = location
+        if count == 0:
+            return []
+        columns = EVIDENCE_SCHEMA.names if full_page else EVIDENCE_SCHEMA.names[:-1]
+        first, last = start // EVIDENCE_ROW_GROUP, (start + count - 1) // EVIDENCE_ROW_GROUP
+        groups = self._evidence_file.read_row_groups(list(range(first, last + 1)), columns=columns)
+        offset = start - first * EVIDENCE_ROW_GROUP
+        return groups.slice(offset, count).to_pylist()
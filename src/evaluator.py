@@ -2,11 +2,44 @@ import os
 import pandas as pd
 import numpy as np
 import re
+import copy
+import json
+import hashlib
 from datetime import datetime
 
+try:
+    from .tracing import span
+    from .caching import LRUCache, JsonDiskCache
+    from .fundamentals_store import FundamentalsStore
+    from .units import detect_context, dominant, rescale
+    from .batch_validator import validate_batch, flag_sector_outliers
+    from .table_index import CONTENT_INDEX, read_index
+except ImportError:
+    from tracing import span
+    from caching import LRUCache, JsonDiskCache
+    from fundamentals_store import FundamentalsStore
+    from units import detect_context, dominant, rescale
+    from batch_validator import validate_batch, flag_sector_outliers
+    from table_index import CONTENT_INDEX, read_index
+
+# a year, never the integer part of a decimal value (2015.3), 2022.0 from a typed period row still counts
+YEAR_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})(?!\d|\.\d*[1-9])')
+NUMBER_CELL = re.compile(r'^\(?-?[$\s]*[\d,]*\.?\d+\)?%?$')
+# part of every cache fingerprint, bump it whenever a change to the evaluator changes what a report contains
+REPORT_VERSION = 5
+
 class FinancialEvaluator:
-    def __init__(self, canonical_dir):
+    def __init__(self, canonical_dir, use_cache=True, cache_size=256, cache_dir=None):
         self.canonical_dir = canonical_dir
+        # analyze_company results, keyed by company id and validated against the source tables
+        self.use_cache = use_cache
+        self._results = LRUCache(maxsize=cache_size)
+        self._scans = LRUCache(maxsize=cache_size)
+        self._disk = JsonDiskCache(cache_dir or os.path.join(canonical_dir, ".eval_cache")) if use_cache else None
+        self._listing = (None, [])
+        self._owners = (None, {})
+        # parsed csv per stored file, tables shared by several filings are read once
+        self._tables = LRUCache(maxsize=cache_size * 4)
 
     def _clean_value(self, val):
         if pd.isna(val) or val == "" or str(val).strip() in ["—", "-", "None", "0.0"]:
@@ -21,129 +54,302 @@ class FinancialEvaluator:
             return 0.0
 
     def _detect_context(self, df):
-        text = (df.to_string()[:1000]).lower()
-        unit = "millions" if "million" in text else "thousands" if "thousand" in text else "units"
-        currency = "USD" if any(x in text for x in ["$", "usd", "dollar"]) else "EUR" if "€" in text else "Unknown"
-        return unit, currency
+        # fallback for canonical dirs without sidecars: header and first rows only, no to_string()
+        header_text = " ".join(df.columns.astype(str))
+        rows_text = "\n".join("|".join(map(str, row)) for row in df.head(3).values)
+        unit, currency = detect_context(header_text, rows_text=rows_text)
+        return unit or "units", currency or "Unknown"
 
-    def _get_metrics(self, company_id):
-        # konwledge structure intiation
-        store = {
-            "observed": {
-                "revenue": {"value": 0.0, "source": None},
-                "net_income": {"value": 0.0, "source": None},
-                "assets": {"value": 0.0, "source": None},
-                "liabilities": {"value": 0.0, "source": None}
-            },
-            "metadata": {"unit": "unknown", "currency": "unknown", "files": []}
-        }
-        
-        target_year = re.search(r'_(\d{4})', company_id).group(1) if re.search(r'_(\d{4})', company_id) else None
-        
-        try:
-            files = [f for f in os.listdir(self.canonical_dir) if f.startswith(company_id) and f.endswith('.csv')]
-            for file_name in files:
-                df = pd.read_csv(os.path.join(self.canonical_dir, file_name))
-                if df.empty: continue
-                
-                if store["metadata"]["unit"] == "unknown":
-                    u, c = self._detect_context(df)
-                    store["metadata"]["unit"], store["metadata"]["currency"] = u, c
-                
-                store["metadata"]["files"].append(file_name)
-                
-                target_col = None
-                for col_idx in range(df.shape[1]):
-                    header = str(df.columns[col_idx]) + " " + " ".join(df.iloc[:3, col_idx].astype(str))
-                    if target_year and target_year in header:
-                        target_col = col_idx; break
-                
-                if target_col is None: continue
-
-                for i in range(len(df)):
-                    row_txt = " ".join(df.iloc[i, :target_col].astype(str)).lower()
-                    val = self._clean_value(df.iloc[i, target_col])
-                    if val == 0.0: continue
+    def _table_contexts(self, company_id):
+        # filing -> sidecar written by the canonicalizer ({"default_unit", "tables": {table_id: {...}}})
+        contexts = {}
+        for name in self._company_sidecars(company_id):
+            try:
+                with open(os.path.join(self.canonical_dir, name), 'r', encoding='utf-8') as f:
+                    contexts[name[:-len(".tables.json")]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return contexts
 
-                    # Mapping logic dengan source tracking
-                    target_key = None
-                    if "net sales" in row_txt or "total revenue" in row_txt:
-                        if not any(x in row_txt for x in ["cost", "growth"]): target_key = "revenue"
-                    elif "net income" in row_txt or "net earnings" in row_txt:
-                        if not "per share" in row_txt: target_key = "net_income"
-                    elif "total assets" in row_txt: target_key = "assets"
-                    elif "total liabilities" in row_txt and "equity" not in row_txt: target_key = "liabilities"
+    def _classify_row(self, row_txt):
+        # Mapping logic dengan source tracking
+        if "net sales" in row_txt or "total revenue" in row_txt:
+            if not any(x in row_txt for x in ["cost", "growth"]): return "revenue"
+        elif "net income" in row_txt or "net earnings" in row_txt:
+            if not "per share" in row_txt: return "net_income"
+        elif "total assets" in row_txt: return "assets"
+        elif "total liabilities" in row_txt and "equity" not in row_txt: return "liabilities"
+        return None
 
+    def _period_columns(self, df, cells):
+        # first column mentioning each fiscal year, in the header or the first 3 rows.
+        # numbers in a labelled row are values (2,015.3 is written as 2015.3), only a row of bare numbers is a period row
+        top = []
+        for row in cells[:3]:
+            numeric = [bool(NUMBER_CELL.match(c.strip())) for c in row]
+            period_row = all(n or c.strip() in ("", "nan") for n, c in zip(numeric, row))
+            top.append([c if period_row or not n else "" for n, c in zip(numeric, row)])
+        columns = {}
+        for col_idx in range(df.shape[1]):
+            header = str(df.columns[col_idx]) + " " + " ".join(row[col_idx] for row in top)
+            for year in YEAR_PATTERN.findall(header):
+                columns.setdefault(year, col_idx)
+        return columns
+
+    def _scan_filing(self, company_id):
+        # one pass over every table of a filing, every fiscal-year column is read at once
+        scan = {"periods": {}, "metadata": {"unit": "unknown", "currency": "unknown", "files": []}}
+        contexts = self._table_contexts(company_id)
+        units, currencies = [], []
+        for file_name, stored_name in self._company_tables(company_id, contexts):
+            parsed = self._read_table(stored_name)
+            if parsed is None: continue
+            df, cells, values, periods = parsed
+
+            table_id = file_name[:-len(".csv")]
+            sidecar = contexts.get(table_id.rsplit('_', 1)[0])
+            if sidecar is not None:
+                ctx = sidecar["tables"].get(table_id, {})
+                unit = ctx.get("unit") or sidecar.get("default_unit")
+                currency = ctx.get("currency") or sidecar.get("default_currency")
+            else:
+                unit, currency = self._detect_context(df)
+                unit = None if unit == "units" else unit
+                currency = None if currency == "Unknown" else currency
+            units.append(unit)
+            currencies.append(currency)
+
+            # source stays the logical table id even when the content is stored under another one
+            scan["metadata"]["files"].append(file_name)
+
+            for year, col in periods.items():
+                observed = scan["periods"].setdefault(year, {})
+                for i in range(len(values)):
+                    val = self._clean_value(values[i][col])
+                    if val == 0.0: continue
+                    target_key = self._classify_row(" ".join(cells[i][:col]).lower())
                     if target_key:
-                        store["observed"][target_key] = {"value": val, "source": file_name, "ts": datetime.now().isoformat()}
+                        observed[target_key] = {"value": val, "source": file_name, "ts": datetime.now().isoformat(), "unit": unit}
 
-            return store
-        except Exception as e:
+        if not scan["metadata"]["files"]:
+            return scan
+
+        # every observation is brought to the filing's dominant scale
+        common_unit = dominant(units) or "units"
+        scan["metadata"]["unit"] = common_unit
+        scan["metadata"]["currency"] = dominant(currencies) or "Unknown"
+        for observed in scan["periods"].values():
+            for obs in observed.values():
+                unit = obs.pop("unit")
+                if unit and unit != common_unit and common_unit != "units":
+                    obs["value"] = round(rescale(obs["value"], unit, common_unit), 6)
+                    obs["scale_adjusted_from"] = unit
+        return scan
+
+    def _read_table(self, stored_name):
+        path = os.path.join(self.canonical_dir, stored_name)
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._tables.get(stored_name) if self.use_cache else None
+        if cached and cached[0] == key:
+            return cached[1]
+        df = pd.read_csv(path)
+        if df.empty:
+            parsed = None
+        else:
+            # str() per cell, newer pandas keeps NaN as a float through astype(str)
+            values = df.values.tolist()
+            cells = [[str(v) for v in row] for row in values]
+            parsed = (df, cells, values, self._period_columns(df, cells))
+        if self.use_cache:
+            self._tables.set(stored_name, (key, parsed))
+        return parsed
+
+    def _cached_scan(self, company_id):
+        if not self.use_cache:
+            return self._scan_filing(company_id)
+        fingerprint = self._source_fingerprint(company_id)
+        cached = self._scans.get(company_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        scan = self._scan_filing(company_id)
+        self._scans.set(company_id, (fingerprint, scan))
+        return scan
+
+    def _get_metrics(self, company_id):
+        with span("evaluate.read_tables", company_id=company_id) as s:
+            # konwledge structure intiation
+            store = {
+                "observed": {
+                    "revenue": {"value": 0.0, "source": None},
+                    "net_income": {"value": 0.0, "source": None},
+                    "assets": {"value": 0.0, "source": None},
+                    "liabilities": {"value": 0.0, "source": None}
+                },
+                "metadata": {"unit": "unknown", "currency": "unknown", "files": []}
+            }
+
+            target_year = re.search(r'_(\d{4})', company_id).group(1) if re.search(r'_(\d{4})', company_id) else None
+
+            try:
+                scan = self._cached_scan(company_id)
+            except OSError:
+                # a table vanished mid-scan (the canonicalizer is rewriting it), an all-zero report would overwrite good results
+                raise
+            except Exception as e:
+                s.set(error=str(e))
+                return store
+
+            store["metadata"] = copy.deepcopy(scan["metadata"])
+            if target_year:
+                store["observed"].update(copy.deepcopy(scan["periods"].get(target_year, {})))
+            s.set(files=len(store["metadata"]["files"]))
             return store
 
+    def company_ids(self):
+        # COMPANY_PERIOD ids present in the canonical store
+        ids = set()
+        for f in os.listdir(self.canonical_dir):
+            # a filing whose tables all duplicate another filing only has a sidecar
+            if f.endswith('.csv') or f.endswith('.tables.json'):
+                parts = f.split('_')
+                if len(parts) >= 2:
+                    ids.add(f"{parts[0]}_{parts[1]}")
+        return sorted(ids)
+
+    def build_fundamentals_store(self, company_ids=None, store=None):
+        # every filing contributes all the fiscal years it reports, not only its own
+        store = store if store is not None else FundamentalsStore()
+        with span("evaluate.fundamentals_store") as s:
+            ids = company_ids if company_ids is not None else self.company_ids()
+            for company_id in ids:
+                try:
+                    store.add_filing(company_id, self._cached_scan(company_id))
+                except Exception as e:
+                    print(f"[!] Fundamentals scan failed for {company_id}: {e}")
+            s.set(filings=len(ids), observations=len(store))
+        return store
+
+    def _canonical_listing(self):
+        # directory listing is reused until a table is added or removed
+        dir_mtime = os.stat(self.canonical_dir).st_mtime_ns
+        if self._listing[0] != dir_mtime:
+            self._listing = (dir_mtime, sorted(os.listdir(self.canonical_dir)))
+        return self._listing[1]
+
+    def _company_files(self, company_id, suffix='.csv'):
+        # the separator keeps ACME_2023 from picking up ACME_2023Q2_* interim filings
+        return [f for f in self._canonical_listing() if (f.startswith(company_id + '_') or f == company_id + suffix) and f.endswith(suffix)]
+
+    def _company_sidecars(self, company_id):
+        return self._company_files(company_id, '.tables.json')
+
+    def _content_owners(self):
+        # content hash -> table id holding the csv, reloaded when the canonicalizer rewrites the index
+        path = os.path.join(self.canonical_dir, CONTENT_INDEX)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        if self._owners[0] != mtime:
+            self._owners = (mtime, {h: e["table"] for h, e in read_index(self.canonical_dir).items()})
+        return self._owners[1]
+
+    def _company_tables(self, company_id, contexts=None):
+        # (logical csv name, stored csv name), in the same order as the plain directory listing
+        contexts = self._table_contexts(company_id) if contexts is None else contexts
+        owners = self._content_owners()
+        tables = {}
+        for sidecar in contexts.values():
+            for table_id, ctx in sidecar.get("tables", {}).items():
+                stored = owners.get(ctx.get("content_hash")) or ctx.get("stored_as") or table_id
+                tables[f"{table_id}.csv"] = f"{stored}.csv"
+        listing = set(self._canonical_listing())
+        tables = {name: stored for name, stored in tables.items() if stored in listing}
+        # canonical dirs written before dedup (or without sidecars) are read as they are
+        for name in self._company_files(company_id):
+            tables.setdefault(name, name)
+        return sorted(tables.items())
+
+    def _source_fingerprint(self, company_id):
+        # any rewrite by the canonicalizer changes mtime or size, so stale results never match,
+        # and reports persisted by an older evaluator never match the current REPORT_VERSION
+        h = hashlib.sha1(f"report:v{REPORT_VERSION};".encode())
+        stored = sorted({s for _, s in self._company_tables(company_id)})
+        for name in stored + self._company_sidecars(company_id):
+            st = os.stat(os.path.join(self.canonical_dir, name))
+            h.update(f"{name}:{st.st_mtime_ns}:{st.st_size};".encode())
+        return h.hexdigest()
+
+    def invalidate(self, company_id=None):
+        if company_id is None:
+            self._results.clear()
+            self._scans.clear()
+            return
+        self._results.pop(company_id)
+        self._scans.pop(company_id)
+        if self._disk:
+            self._disk.pop(company_id)
+
     def analyze_company(self, company_id):
+        with span("evaluate.company", company_id=company_id) as s:
+            if not self.use_cache:
+                report = self._analyze_company(company_id)
+                s.set(cache="off", sanity_score=report["epistemic_status"]["sanity_score"])
+                return report
+
+            fingerprint = self._source_fingerprint(company_id)
+            report, source = self._cached_report(company_id, fingerprint)
+            if report is not None:
+                s.set(cache=source)
+                return report
+
+            report = self._analyze_company(company_id)
+            self._store_report(company_id, fingerprint, report)
+            s.set(cache="miss", sanity_score=report["epistemic_status"]["sanity_score"])
+            return report
+
+    def _cached_report(self, company_id, fingerprint):
+        cached = self._results.get(company_id)
+        if cached and cached[0] == fingerprint:
+            return copy.deepcopy(cached[1]), "memory"
+
+        entry = self._disk.get(company_id)
+        if entry and entry.get("fingerprint") == fingerprint:
+            self._results.set(company_id, (fingerprint, entry["report"]))
+            return copy.deepcopy(entry["report"]), "disk"
+        return None, None
+
+    def _store_report(self, company_id, fingerprint, report):
+        # stored without sector flags, those depend on the peers of each call
+        self._results.set(company_id, (fingerprint, copy.deepcopy(report)))
+        self._disk.set(company_id, {"fingerprint": fingerprint, "report": report})
+
+    def _analyze_company(self, company_id):
         raw = self._get_metrics(company_id)
-        obs = raw["observed"]
-        
-        # Deductive reasoning layer
-        inferred = {}
-        
-        # counting net margin
-        rev = obs["revenue"]["value"]
-        ni = obs["net_income"]["value"]
-        if rev != 0 and ni != 0:
-            inferred["net_margin"] = {
-                "value": round(ni / rev, 4),
-                "method": "deduced_from_observed",
-                "formula": "net_income / revenue"
-            }
-        
-        # Calculate Equity and Prove Accounting Identity
-        assets = obs["assets"]["value"]
-        liab = obs["liabilities"]["value"]
-        equity_calc = round(assets - liab, 2)
-        
-        # epistemic validation
-        anomalies = []
-        is_collision = (assets == liab and assets != 0)
-        
-        # Identity Check
-        identity_holds = (assets != 0 and liab != 0 and abs(assets - (liab + equity_calc)) < 1.0)
-        
-        if is_collision:
-            anomalies.append({"type": "data_collision", "severity": "CRITICAL", "rationale": "Assets == Liabilities detected."})
-        
-        # scoring
-        completeness = sum(1 for v in obs.values() if v["value"] != 0) / 4
-        sanity_score = 1.0
-        if is_collision: sanity_score -= 0.8
-        if not identity_holds and assets != 0: sanity_score -= 0.4
-        if raw["metadata"]["currency"] == "Unknown": sanity_score -= 0.2
-        
-        sanity_score = max(0.1, round(sanity_score, 2))
-
-        return {
-            "entity": company_id.split('_')[0] if company_id else "UNKNOWN",
-            "period": company_id.split('_')[1] if '_' in company_id else "UNKNOWN",
-            "knowledge_base": {
-                "observed": obs,
-                "inferred": inferred,
-                "accounting_proof": {
-                    "equity_deduced": equity_calc if not is_collision else "UNRELIABLE",
-                    "identity_verified": identity_holds
-                }
-            },
-            "epistemic_status": {
-                "completeness": completeness,
-                "sanity_score": sanity_score,
-                "data_integrity": "PASSED" if sanity_score > 0.6 and not is_collision else "FAILED"
-            },
-            "anomalies": anomalies,
-            "llm_semantic_contract": {
-                "safe_to_reason": (completeness >= 0.75 and sanity_score >= 0.6),
-                "reasoning_mode": "deductive" if identity_holds else "investigative",
-                "known_unknowns": [k for k, v in obs.items() if v["value"] == 0],
-                "caution_note": "Identity failure detected" if not identity_holds and assets != 0 else None
-            },
-            "metadata": raw["metadata"]
-        }
+        # the scalar path is a batch of one, so both produce the same contract
+        return validate_batch([company_id], [raw])[0]
+
+    def analyze_companies(self, company_ids, sectors=None):
+        # all filings validated together, sectors (ENTITY -> gics_sector) enables peer outlier checks
+        company_ids = list(company_ids)
+        with span("evaluate.batch", companies=len(company_ids)) as s:
+            reports = [None] * len(company_ids)
+            fingerprints = {}
+            if self.use_cache:
+                for i, cid in enumerate(company_ids):
+                    fingerprints[cid] = self._source_fingerprint(cid)
+                    reports[i], _ = self._cached_report(cid, fingerprints[cid])
+
+            # only the misses are scanned, as one batch
+            misses = [i for i, report in enumerate(reports) if report is None]
+            if misses:
+                ids = [company_ids[i] for i in misses]
+                fresh = validate_batch(ids, [self._get_metrics(cid) for cid in ids])
+                for i, report in zip(misses, fresh):
+                    if self.use_cache:
+                        self._store_report(company_ids[i], fingerprints[company_ids[i]], report)
+                    reports[i] = report
+            s.set(hits=len(company_ids) - len(misses), misses=len(misses))
+
+            # peer checks always see the whole batch, cached reports included
+            if sectors is not None:
+                flag_sector_outliers(company_ids, reports, sectors)
+            return reports
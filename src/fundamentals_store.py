@@ -0,0 +1,146 @@
+import re
+import json
+import os
+from collections import Counter
+
+try:
+    from .units import rescale
+except ImportError:
+    from units import rescale
+
+# filings declare their own scale, the store keeps everything it can in one
+STORE_UNIT = "millions"
+
+_FILING_PATTERN = re.compile(r'^(\d{4})(?:Q([1-4]))?')
+# point-in-time metrics, a 10-Q compares them with the prior fiscal year-end rather than the same quarter
+BALANCE_SHEET_METRICS = {"assets", "liabilities"}
+
+
+def _filing_rank(filing):
+    # newer filings restate older years, so they win on conflicts
+    m = _FILING_PATTERN.match(str(filing))
+    if not m:
+        return (0, 0)
+    return (int(m.group(1)), int(m.group(2) or 5))
+
+
+class FundamentalsStore:
+    # (company, period, metric) -> observation, with a company -> metric -> periods index
+    def __init__(self):
+        self._values = {}
+        self._index = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, company, period, metric, value, source=None, filing=None, unit=STORE_UNIT, fallback=False):
+        # fallback observations only fill a gap, any regular one replaces them
+        key = (company, period, metric)
+        current = self._values.get(key)
+        if current is not None:
+            if fallback and not current.get("fallback"):
+                return False
+            if bool(current.get("fallback")) == fallback and _filing_rank(current["filing"]) > _filing_rank(filing):
+                return False
+        self._values[key] = {"value": float(value), "source": source, "filing": filing, "unit": unit}
+        if fallback:
+            self._values[key]["fallback"] = True
+        self._index.setdefault(company, {}).setdefault(metric, set()).add(period)
+        return True
+
+    def add_filing(self, company_id, scan):
+        # scan is FinancialEvaluator._scan_filing output: {"periods": {year: {metric: obs}}}
+        entity, _, filing = company_id.partition('_')
+        # a 10-Q's prior-year column is the same quarter one year earlier for flows,
+        # and the prior fiscal year-end for balance-sheet items, kept only until a 10-K reports that year
+        suffix = re.sub(r'^\d{4}', '', filing)
+        own_year = filing[:4]
+        # undeclared scales ("units") are kept as reported
+        unit = scan["metadata"].get("unit")
+        target = STORE_UNIT if unit in ("thousands", "millions", "billions") else "units"
+        for year, observed in scan["periods"].items():
+            for metric, obs in observed.items():
+                value = rescale(obs["value"], unit, target)
+                if suffix and metric in BALANCE_SHEET_METRICS and year != own_year:
+                    self.add(entity, year, metric, value, obs.get("source"), filing, target, fallback=True)
+                else:
+                    self.add(entity, f"{year}{suffix}", metric, value, obs.get("source"), filing, target)
+
+    def get(self, company, period, metric, default=None):
+        obs = self._values.get((company, period, metric))
+        return obs["value"] if obs else default
+
+    def observation(self, company, period, metric):
+        return self._values.get((company, period, metric))
+
+    def companies(self):
+        return sorted(self._index)
+
+    def metrics(self, company):
+        return sorted(self._index.get(company, {}))
+
+    def periods(self, company, metric=None):
+        by_metric = self._index.get(company, {})
+        if metric is not None:
+            return sorted(by_metric.get(metric, ()))
+        return sorted(set().union(*by_metric.values())) if by_metric else []
+
+    def _dominant_unit(self, observations):
+        counts = Counter(obs["unit"] for obs in observations)
+        if not counts:
+            return None
+        best = max(counts.values())
+        return STORE_UNIT if counts.get(STORE_UNIT) == best else counts.most_common(1)[0][0]
+
+    def series(self, company, metric, quarter="", unit=None):
+        # annual series by default, quarter="Q2" gives the Q2 series.
+        # only one scale per series: the given unit, or the one most observations are in
+        periods = [p for p in self.periods(company, metric) if re.sub(r'^\d{4}', '', p) == quarter]
+        observations = [(p, self._values[(company, p, metric)]) for p in periods]
+        unit = unit or self._dominant_unit(obs for _, obs in observations)
+        return [(p, obs["value"]) for p, obs in observations if obs["unit"] == unit]
+
+    def growth(self, company, metric="revenue", quarter="", unit=None):
+        series = self.series(company, metric, quarter, unit)
+        yoy = {}
+        for (_, prev), (period, cur) in zip(series, series[1:]):
+            if prev:
+                yoy[period] = round((cur - prev) / abs(prev), 4)
+        cagr = None
+        if len(series) >= 2:
+            (p0, first), (p1, last) = series[0], series[-1]
+            years = int(p1[:4]) - int(p0[:4])
+            if years > 0 and first > 0 and last > 0:
+                cagr = round((last / first) ** (1 / years) - 1, 4)
+        return {"company": company, "metric": metric, "series": series, "yoy": yoy, "cagr": cagr}
+
+    def margin_series(self, company, numerator="net_income", denominator="revenue", quarter=""):
+        # a ratio is only taken between observations on the same scale
+        out = []
+        for period in self.periods(company, denominator):
+            if re.sub(r'^\d{4}', '', period) != quarter:
+                continue
+            num = self._values.get((company, period, numerator))
+            den = self._values[(company, period, denominator)]
+            if num and den["value"] and num["unit"] == den["unit"]:
+                out.append((period, round(num["value"] / den["value"], 4)))
+        return out
+
+    def to_dict(self):
+        return {"observations": [
+            {"company": c, "period": p, "metric": m, **obs} for (c, p, m), obs in sorted(self._values.items())
+        ]}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, 'r') as f:
+            for row in json.load(f)["observations"]:
+                store.add(row["company"], row["period"], row["metric"], row["value"], row.get("source"), row.get("filing"),
+                          row.get("unit", STORE_UNIT), row.get("fallback", False))
+        return store
@@ -1,18 +1,50 @@
 import os
 import json
 import glob
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+
+try:
+    from .lazy_loader import LazyEngine
+except ImportError:
+    from lazy_loader import LazyEngine
+
+def _build_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
 class FinancialIndexer:
-    def __init__(self):
-        self.input_dir = "data/processed/decomposed"
-        self.db_dir = "data/database/chroma_db"
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    def __init__(self, input_dir="data/processed/decomposed", db_dir="data/database/chroma_db"):
+        self.input_dir = input_dir
+        self.db_dir = db_dir
+        # sentence-transformers model is only loaded when we actually embed
+        self.embeddings = LazyEngine("embeddings", _build_embeddings)
+        self._vector_db = None
+
+    def _load_document(self, file_path):
+        from langchain_core.documents import Document
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            
+        narrative_text = ""
+        for item in data:
+            if item.get('type') == 'text':
+                narrative_text += item.get('content', '') + "\n\n"
+        
+        if not narrative_text.strip():
+            return None
+        # adding list into langchain docs and metadata
+        return Document(
+            page_content=narrative_text,
+            metadata={"source": os.path.basename(file_path)}
+        )
+
+    def _splitter(self):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
 
     def create_index(self):
+        from langchain_community.vectorstores import Chroma
+
         # searching all json file in decomposed folder
         files = glob.glob(os.path.join(self.input_dir, "*.json"))
         
@@ -25,20 +57,8 @@ class FinancialIndexer:
         all_docs = []
         for file_path in files:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                narrative_text = ""
-                for item in data:
-                    if item.get('type') == 'text':
-                        narrative_text += item.get('content', '') + "\n\n"
-                
-                if narrative_text.strip():
-                    # adding list into langchain docs and metadata
-                    doc = Document(
-                        page_content=narrative_text,
-                        metadata={"source": os.path.basename(file_path)}
-                    )
+                doc = self._load_document(file_path)
+                if doc is not None:
                     all_docs.append(doc)
             except Exception as e:
                 print(f"failed to read {file_path}: {e}")
@@ -48,17 +68,34 @@ class FinancialIndexer:
             return
 
         print(f"chunking {len(all_docs)} docs")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        chunks = text_splitter.split_documents(all_docs)
+        chunks = self._splitter().split_documents(all_docs)
 
         print(f"save {len(chunks)} to vector database")
         vector_db = Chroma.from_documents(
             documents=chunks,
-            embedding=self.embeddings,
+            embedding=self.embeddings.get(),
             persist_directory=self.db_dir
         )
         print(f"finished")
 
+    def index_file(self, file_path):
+        # (re)index one decomposed filing, its old chunks are replaced so reruns don't duplicate
+        from langchain_community.vectorstores import Chroma
+
+        if self._vector_db is None:
+            self._vector_db = Chroma(persist_directory=self.db_dir, embedding_function=self.embeddings.get())
+        source = os.path.basename(file_path)
+        stale = self._vector_db.get(where={"source": source}).get("ids", [])
+        if stale:
+            self._vector_db.delete(ids=stale)
+
+        doc = self._load_document(file_path)
+        if doc is None:
+            return 0
+        chunks = self._splitter().split_documents([doc])
+        self._vector_db.add_documents(chunks, ids=[f"{source}:{i}" for i in range(len(chunks))])
+        return len(chunks)
+
 if __name__ == "__main__":
     indexer = FinancialIndexer()
     indexer.create_index()
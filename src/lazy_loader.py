@@ -0,0 +1,89 @@
+import importlib
+import threading
+import time
+
+# startup timing registry, one entry per component
+_TIMINGS = {}
+_TIMINGS_LOCK = threading.Lock()
+
+
+def _record(name, seconds, status):
+    with _TIMINGS_LOCK:
+        _TIMINGS[name] = {"component": name, "seconds": round(seconds, 4), "status": status}
+
+
+class LazyEngine:
+    # heavy component proxy: built on first use or by warm_up()
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is not None:
+            return self._instance
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    self._error = e
+                    _record(self._name, time.perf_counter() - start, f"FAILED: {e}")
+                    raise
+                _record(self._name, time.perf_counter() - start, "LOADED")
+        return self._instance
+
+    def warm_up(self, background=True):
+        if self.loaded:
+            return None
+        if not background:
+            self.get()
+            return None
+        if self._thread is None:
+            _record(self._name, 0.0, "WARMING")
+            self._thread = threading.Thread(target=self._safe_get, name=f"warmup-{self._name}", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _safe_get(self):
+        try:
+            self.get()
+        except Exception:
+            # error already recorded, caller will see it again on first real use
+            pass
+
+    def __getattr__(self, attr):
+        # only called for attributes the proxy itself doesn't have
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+
+def lazy_module(module_name, name=None):
+    return LazyEngine(name or module_name, lambda: importlib.import_module(module_name))
+
+
+def warm_up(*engines):
+    threads = [engine.warm_up(background=True) for engine in engines if engine is not None]
+    return [t for t in threads if t is not None]
+
+
+def startup_report():
+    with _TIMINGS_LOCK:
+        return sorted(_TIMINGS.values(), key=lambda r: r["seconds"], reverse=True)
+
@@ -0,0 +1,316 @@
+import re
+import copy
+import time
+import queue
+import random
+import hashlib
+import threading
+import contextvars
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    from .caching import LRUCache
+    from .tracing import span
+    from .streaming import current_listener, stage_listener
+except ImportError:
+    from caching import LRUCache
+    from tracing import span
+    from streaming import current_listener, stage_listener
+
+# the bridge reports quota problems as a notice in place of the answer (compared case-insensitively)
+RATE_LIMIT_MARKERS = ("token has reached", "precision lock")
+# generic wording that an audit can use too, only a short reply made of it is a notice
+RATE_LIMIT_PHRASES = ("rate limit",)
+NOTICE_MAX_CHARS = 300
+
+
+def normalize_prompt(prompt):
+    # case, whitespace and trailing punctuation don't change the audit question
+    text = re.sub(r'\s+', ' ', str(prompt)).strip().lower()
+    return text.rstrip(' ?!.')
+
+
+def is_rate_limited(result):
+    # structured errors first, the text only for the bridge's notices, an audit that discusses rate limits is an answer
+    if isinstance(result, Exception):
+        status = getattr(result, "status_code", None) or getattr(result, "code", None)
+        if status == 429 or type(result).__name__ == "RateLimitError":
+            return True
+        text = str(result)
+    elif isinstance(result, dict):
+        if result.get("status_code") == 429:
+            return True
+        text = str(result.get("answer", ""))
+    else:
+        text = str(result)
+    text = text.strip().lower()
+    if any(marker in text for marker in RATE_LIMIT_MARKERS):
+        return True
+    return len(text) <= NOTICE_MAX_CHARS and any(phrase in text for phrase in RATE_LIMIT_PHRASES)
+
+
+class _Pending:
+    __slots__ = ("prompt", "key", "future", "context", "listeners")
+
+    def __init__(self, prompt, key):
+        self.prompt = prompt
+        self.key = key
+        self.future = Future()
+        # first caller's context (trace span), and the stage listener of every caller waiting on this prompt
+        self.context = contextvars.copy_context()
+        self.listeners = []
+
+    def emit(self, stage, payload):
+        for listener in list(self.listeners):
+            listener(stage, payload)
+
+
+class LLMGateway:
+    # response cache + single-flight + micro-batching queue in front of bridge.smart_query
+    def __init__(self, backend, fingerprint=None, cache_size=512, ttl=6 * 3600, max_batch=8, batch_window=0.02,
+                 concurrency=4, max_retries=3, base_backoff=1.0, max_backoff=30.0):
+        self.backend = backend
+        # audit-data fingerprint, a new one makes every cached answer unreachable
+        self.fingerprint = fingerprint or (lambda: "")
+        self.cache = LRUCache(maxsize=cache_size, ttl=ttl)
+        # without a batch endpoint every backend call carries one prompt
+        self.max_batch = max_batch if hasattr(backend, "smart_query_batch") else 1
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="llm")
+        self._cooldown_until = 0.0
+        # backend calls allowed at once, halved on a rate limit and grown back one per success
+        self._concurrency = concurrency
+        self._allowed = concurrency
+        self._active = 0
+        self._calls = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="llm-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def __getattr__(self, attr):
+        # anything else (engine, config...) is still the bridge's
+        if attr == "backend":
+            raise AttributeError(attr)
+        return getattr(self.backend, attr)
+
+    def _key(self, prompt):
+        return hashlib.sha1(f"{self.fingerprint()}\x00{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+    def smart_query(self, prompt, timeout=None):
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return copy.deepcopy(cached)
+
+        listener = current_listener()
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = _Pending(prompt, key)
+                self._inflight[key] = pending
+                self._queue.put(pending)
+                self._count("misses")
+            else:
+                # same question already on its way to the model
+                self._count("coalesced")
+            if listener is not None:
+                pending.listeners.append(listener)
+        return copy.deepcopy(pending.future.result(timeout))
+
+    def stream_query(self, prompt):
+        # cache hits come back at once. a miss streams from the bridge on the caller's thread, under the same
+        # single-flight, cool-down, retry and concurrency limits as queued calls; identical prompts wait for its result
+        stream_fn = getattr(self.backend, "stream_query", None)
+        if stream_fn is None:
+            yield self.smart_query(prompt)
+            return
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            yield copy.deepcopy(cached)
+            return
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending(prompt, key)
+                self._inflight[key] = pending
+        if not owner:
+            self._count("coalesced")
+            yield copy.deepcopy(pending.future.result())
+            return
+
+        self._count("misses")
+        result = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait_cooldown()
+                self._acquire_call()
+                tokens, result, limited = [], None, False
+                try:
+                    with span("llm.stream", attempt=attempt):
+                        self._count("backend_calls")
+                        for chunk in stream_fn(prompt):
+                            if isinstance(chunk, dict):
+                                result = chunk
+                                limited = is_rate_limited(chunk)
+                                # nothing shown yet, the notice is swallowed and the prompt retried
+                                if limited and not tokens and attempt < self.max_retries:
+                                    break
+                            else:
+                                tokens.append(chunk)
+                            yield chunk
+                finally:
+                    self._release_call(limited)
+                if result is None:
+                    result = "".join(map(str, tokens))
+                    limited = is_rate_limited(result)
+                if not (limited and not tokens and attempt < self.max_retries):
+                    break
+                self._count("rate_limited")
+                self._back_off(attempt)
+        except BaseException as e:
+            # failed or abandoned by the caller, prompts waiting on this stream get the error instead of hanging
+            self._resolve(pending, e if isinstance(e, Exception) else RuntimeError("stream closed before completion"))
+            raise
+        self._resolve(pending, result)
+
+    # queueing
+    def _dispatch(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            # blocks while every slot is busy, the queue keeps filling and the next batch is fuller
+            self._slots.acquire()
+            self._pool.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        try:
+            pending = batch
+            for attempt in range(self.max_retries + 1):
+                self._wait_cooldown()
+                self._acquire_call()
+                limited = False
+                try:
+                    with span("llm.batch", size=len(pending), attempt=attempt):
+                        results = self._call_backend(pending)
+                    limited = any(is_rate_limited(r) for r in results)
+                finally:
+                    self._release_call(limited)
+                retry = []
+                for item, result in zip(pending, results):
+                    if is_rate_limited(result) and attempt < self.max_retries:
+                        retry.append(item)
+                    else:
+                        self._resolve(item, result)
+                if not retry:
+                    return
+                self._count("rate_limited", len(retry))
+                self._back_off(attempt)
+                pending = retry
+        except Exception as e:
+            for item in pending:
+                if not item.future.done():
+                    self._resolve(item, e)
+        finally:
+            self._slots.release()
+
+    def _call_backend(self, items):
+        # callers streaming audit stages get their own call, a shared batch can't tell whose stage is whose
+        results = {}
+        batched = [item for item in items if not item.listeners]
+        if len(batched) > 1:
+            self._count("backend_calls")
+            self._count("batched_prompts", len(batched))
+            try:
+                answers = list(self.backend.smart_query_batch([item.prompt for item in batched]))
+            except Exception as e:
+                answers = [e] * len(batched)
+            results.update(zip(map(id, batched), answers))
+        for item in items:
+            if id(item) not in results:
+                self._count("backend_calls")
+                results[id(item)] = item.context.run(self._call_single, item)
+        return [results[id(item)] for item in items]
+
+    def _call_single(self, item):
+        # runs in the caller's context, stage events from the bridge go back to every caller waiting on it
+        try:
+            with stage_listener(item.emit if item.listeners else None):
+                return self.backend.smart_query(item.prompt)
+        except Exception as e:
+            return e
+
+    def _resolve(self, item, result):
+        if isinstance(result, Exception):
+            item.future.set_exception(result)
+        else:
+            # rate-limited (or empty) answers are returned but never cached
+            if result and not is_rate_limited(result):
+                self.cache.set(item.key, copy.deepcopy(result))
+            item.future.set_result(result)
+        with self._lock:
+            self._inflight.pop(item.key, None)
+
+    # rate limits
+    def _acquire_call(self):
+        with self._calls:
+            while self._active >= self._allowed:
+                self._calls.wait()
+            self._active += 1
+
+    def _release_call(self, limited):
+        with self._calls:
+            self._active -= 1
+            if limited:
+                self._allowed = max(1, self._allowed // 2)
+            else:
+                self._allowed = min(self._concurrency, self._allowed + 1)
+            self._calls.notify_all()
+
+    def _back_off(self, attempt):
+        # shared cool-down, every queued prompt waits instead of hammering the quota
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt)) * (0.5 + random.random() / 2)
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+
+    def _wait_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def close(self):
+        self._queue.put(None)
+        self._pool.shutdown(wait=True)
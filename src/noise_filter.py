@@ -0,0 +1,125 @@
+import re
+import json
+from collections import Counter
+
+# category -> whole words, a trailing * adds the inflections in WORD_SUFFIXES ("recommend*" -> recommends, recommendation)
+DEFAULT_VOCABULARY = {
+    "speculative": {
+        "weight": 1.0,
+        "blocks": True,
+        "terms": ["buy", "sell", "long", "short", "recommend*", "advice", "advise*", "target*"],
+    },
+    "sentiment": {
+        "weight": 0.6,
+        "blocks": False,
+        "terms": ["bullish", "bearish", "hype*", "undervalued", "overvalued", "moon*"],
+    },
+    "temporal": {
+        "weight": 0.4,
+        "blocks": False,
+        "terms": ["surge*", "surging", "plunge*", "plunging", "daily", "news", "rally", "rallies", "correction"],
+    },
+}
+
+# a closed list, so "recognize", "reconcile", "surgery" or "hyperinflation" never match a stem
+WORD_SUFFIXES = ("s", "es", "d", "ed", "ing", "ation", "ations", "er", "ers")
+
+# hyphenated compounds like long-term debt or buy-back are structure, not speculation
+_LEFT = r'(?<![\w-])'
+_RIGHT = r'(?![\w-])'
+
+
+def _term_pattern(term):
+    if term.endswith('*'):
+        return re.escape(term[:-1]) + "(?:" + "|".join(WORD_SUFFIXES) + ")?"
+    return re.escape(term)
+
+
+class NoiseClassifier:
+    # one compiled pass over the query for every category, rebuilt only when the vocabulary changes
+    def __init__(self, vocabulary=None):
+        self.vocabulary = {}
+        for category, spec in (vocabulary or DEFAULT_VOCABULARY).items():
+            self.vocabulary[category] = {
+                "weight": spec.get("weight", 1.0),
+                "blocks": spec.get("blocks", False),
+                "terms": list(spec.get("terms", [])),
+            }
+        self._compile()
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def add_terms(self, category, terms, weight=None, blocks=None):
+        spec = self.vocabulary.setdefault(category, {"weight": 1.0, "blocks": False, "terms": []})
+        spec["terms"].extend(t for t in terms if t not in spec["terms"])
+        if weight is not None:
+            spec["weight"] = weight
+        if blocks is not None:
+            spec["blocks"] = blocks
+        self._compile()
+
+    def _compile(self):
+        # one named group per term so a match maps straight back to (term, category)
+        self._terms = []
+        groups = []
+        for category, spec in self.vocabulary.items():
+            for term in spec["terms"]:
+                groups.append(f"(?P<t{len(self._terms)}>{_term_pattern(term.lower())})")
+                self._terms.append((term.rstrip('*'), category))
+        if groups:
+            self._pattern = re.compile(_LEFT + "(?:" + "|".join(groups) + ")" + _RIGHT, re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def _hits(self, query):
+        if not query or self._pattern is None:
+            return []
+        return sorted({int(m.lastgroup[1:]) for m in self._pattern.finditer(query)})
+
+    def classify(self, query):
+        hits = self._hits(query)
+        detected = [self._terms[i][0] for i in hits]
+        categories = sorted({self._terms[i][1] for i in hits})
+        blocks = any(self.vocabulary[c]["blocks"] for c in categories)
+        return {
+            "is_noisy": len(detected) > 0,
+            "noise_elements": detected,
+            "action": "BLOCK_RECO" if blocks else "IGNORE",
+            "categories": categories,
+            "noise_score": round(min(1.0, sum((self.vocabulary[c]["weight"] for c in categories), 0.0)), 2),
+        }
+
+    def classify_many(self, queries):
+        return [self.classify(q) for q in queries]
+
+    def rescore_log(self, path, field="query", out_path=None):
+        # offline re-scoring of a query log, jsonl rows or one plain query per line
+        summary = {"queries": 0, "noisy": 0, "blocked": 0, "terms": Counter(), "categories": Counter()}
+        out = open(out_path, 'w', encoding='utf-8') if out_path else None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    query = line
+                    if line.startswith('{'):
+                        try:
+                            query = json.loads(line).get(field) or ""
+                        except ValueError:
+                            pass
+                    report = self.classify(query)
+                    summary["queries"] += 1
+                    summary["noisy"] += report["is_noisy"]
+                    summary["blocked"] += report["action"] == "BLOCK_RECO"
+                    summary["terms"].update(report["noise_elements"])
+                    summary["categories"].update(report["categories"])
+                    if out:
+                        out.write(json.dumps({field: query, **report}) + "\n")
+        finally:
+            if out:
+                out.close()
+        return summary
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from .decomposition import decompose_markdown
+    from .canonicalizer import FinancialCanonicalizer
+    from .evaluator import FinancialEvaluator
+    from .fundamentals_store import FundamentalsStore
+    from .warehouse import ResultsWarehouse
+    from .batch_validator import load_sectors, flag_sector_outliers
+    from .tracing import span
+except ImportError:
+    from decomposition import decompose_markdown
+    from canonicalizer import FinancialCanonicalizer
+    from evaluator import FinancialEvaluator
+    from fundamentals_store import FundamentalsStore
+    from warehouse import ResultsWarehouse
+    from batch_validator import load_sectors, flag_sector_outliers
+    from tracing import span
+
+# per-filing stages in dependency order, evaluate is per company and waits for all of its filings
+STAGES = ("decompose", "canonicalize", "index", "evaluate")
+
+
+def fingerprint(paths):
+    # same rule as the evaluator cache: a rewrite changes mtime or size
+    h = hashlib.sha1()
+    for path in sorted(paths):
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return h.hexdigest()
+
+
+def company_of(filing):
+    parts = filing.split('_')
+    return f"{parts[0]}_{parts[1]}" if len(parts) >= 2 else None
+
+
+class PipelineManifest:
+    # node -> input fingerprint of its last successful run, plus the outputs it wrote when they are only known afterwards
+    def __init__(self, path):
+        self.path = path
+        self.base = os.path.dirname(os.path.abspath(path))
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._nodes = json.load(f)
+        except (OSError, ValueError):
+            self._nodes = {}
+
+    def is_current(self, node, fp, outputs=()):
+        entry = self._nodes.get(node)
+        recorded = []
+        if isinstance(entry, dict):
+            entry, recorded = entry["fp"], [os.path.join(self.base, p) for p in entry["outputs"]]
+        # a deleted output makes the node stale even when its inputs are unchanged
+        return entry == fp and all(os.path.exists(p) for p in list(outputs) + recorded)
+
+    def record(self, node, fp, outputs=()):
+        with self._lock:
+            if outputs:
+                self._nodes[node] = {"fp": fp, "outputs": sorted(os.path.relpath(os.path.abspath(p), self.base) for p in outputs)}
+            else:
+                self._nodes[node] = fp
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._nodes, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+class FilingPipeline:
+    def __init__(self, root="data", workers=4, indexer=None, dataset_path=None):
+        self.markdown_dir = os.path.join(root, "processed", "markdown")
+        self.decomposed_dir = os.path.join(root, "processed", "decomposed")
+        self.canonical_dir = os.path.join(root, "processed", "canonical")
+        self.results_dir = os.path.join(root, "results", "evaluations")
+        self.fundamentals_path = os.path.join(root, "results", "fundamentals_store.json")
+        self.dataset_path = dataset_path or os.path.join(root, "financebench_merged.jsonl")
+        for d in (self.decomposed_dir, self.canonical_dir, self.results_dir):
+            os.makedirs(d, exist_ok=True)
+
+        self.workers = workers
+        # indexer is optional, the vector store needs langchain + chroma
+        self.indexer = indexer
+        self.manifest = PipelineManifest(os.path.join(root, "processed", ".pipeline_manifest.json"))
+        self.cleaner = FinancialCanonicalizer()
+        self.evaluator = FinancialEvaluator(self.canonical_dir)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self._md = {}
+        self.wall_s = 0.0
+        self.failures = []
+
+    # discovery
+    def _markdown_files(self):
+        if not os.path.isdir(self.markdown_dir):
+            return {}
+        return {p.stem: p for p in Path(self.markdown_dir).rglob("*.md")}
+
+    def _decomposed_path(self, filing):
+        return os.path.join(self.decomposed_dir, f"{filing}_decomposed.json")
+
+    def discover(self):
+        # filings with markdown start at decompose, already decomposed ones without markdown at canonicalize
+        filings = set(self._markdown_files())
+        for name in os.listdir(self.decomposed_dir):
+            if name.endswith("_decomposed.json"):
+                filings.add(name[:-len("_decomposed.json")])
+        return sorted(filings)
+
+    # nodes, each returns True when it did work and False when it was up to date
+    def _decompose(self, filing, force):
+        source = self._md.get(filing)
+        output = self._decomposed_path(filing)
+        if source is None:
+            return False
+        fp = fingerprint([source])
+        if not force and self.manifest.is_current(f"decompose:{filing}", fp, [output]):
+            return False
+        result = decompose_markdown(source)
+        tmp = output + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+        os.replace(tmp, output)
+        self.manifest.record(f"decompose:{filing}", fp)
+        return True
+
+    def _canonical_outputs(self, filing):
+        # the filing's sidecar and the csvs it stores, tables that duplicate another filing's live there
+        sidecar = os.path.join(self.canonical_dir, f"{filing}.tables.json")
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                tables = json.load(f).get("tables", {})
+        except (OSError, ValueError):
+            return []
+        owned = [t for t, ctx in tables.items() if ctx.get("stored_as", t) == t]
+        return [sidecar] + [os.path.join(self.canonical_dir, f"{t}.csv") for t in owned]
+
+    def _table_filings(self, company_id):
+        # filings whose csvs the evaluator reads for this company, shared tables may be stored under another filing
+        return {stored[:-len(".csv")].rsplit('_', 1)[0] for _, stored in self.evaluator._company_tables(company_id)}
+
+    def _canonicalize(self, filing, force):
+        source = self._decomposed_path(filing)
+        fp = fingerprint([source])
+        if not force and self.manifest.is_current(f"canonicalize:{filing}", fp):
+            return False
+        self.cleaner.process_file(source, self.canonical_dir)
+        self.manifest.record(f"canonicalize:{filing}", fp, self._canonical_outputs(filing))
+        return True
+
+    def _index(self, filing, force):
+        source = self._decomposed_path(filing)
+        fp = fingerprint([source])
+        if not force and self.manifest.is_current(f"index:{filing}", fp, [self.indexer.db_dir]):
+            return False
+        self.indexer.index_file(source)
+        self.manifest.record(f"index:{filing}", fp)
+        return True
+
+    def _evaluate(self, company_id, force):
+        output = os.path.join(self.results_dir, f"{company_id}_eval.json")
+        fp = self.evaluator._source_fingerprint(company_id)
+        if not force and self.manifest.is_current(f"evaluate:{company_id}", fp, [output]):
+            return False
+        report = self.evaluator.analyze_company(company_id)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=4)
+        self.manifest.record(f"evaluate:{company_id}", fp)
+        return True
+
+    def _run_node(self, stage, key, force):
+        start = time.perf_counter()
+        with span(f"pipeline.{stage}", key=key) as s:
+            did_work = getattr(self, f"_{stage}")(key, force)
+            s.set(skipped=not did_work)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            st = self.stats.setdefault(stage, {"ran": 0, "skipped": 0, "failed": 0, "busy_s": 0.0})
+            st["ran" if did_work else "skipped"] += 1
+            st["busy_s"] += elapsed
+        return did_work
+
+    # scheduling
+    def run(self, filings=None, force=False):
+        self.stats = {}
+        self._md = self._markdown_files()
+        all_filings = self.discover()
+        filings = sorted(filings) if filings is not None else all_filings
+
+        # a company is evaluated once its own filings are canonical and so is every filing its tables are stored under,
+        # a filing still in _store_tables on another worker can write, hand off or unlink those csvs
+        remaining = {}
+        for filing in all_filings:
+            cid = company_of(filing)
+            if cid and filing in filings:
+                remaining[cid] = remaining.get(cid, 0) + 1
+        unsettled = set(filings)
+        blocked = set()
+
+        evaluated = []
+        failures = []
+        start = time.perf_counter()
+        # index writes go through one worker, the vector store is a single writer
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="pipeline") as pool, \
+                ThreadPoolExecutor(1, thread_name_prefix="pipeline-index") as index_pool:
+            pending = {}
+
+            def submit(stage, key):
+                executor = index_pool if stage == "index" else pool
+                pending[executor.submit(self._run_node, stage, key, force)] = (stage, key)
+
+            def settle(filing, ok=True):
+                unsettled.discard(filing)
+                cid = company_of(filing)
+                if cid in remaining:
+                    remaining[cid] -= 1
+                    if not ok:
+                        blocked.add(cid)
+                for cid in sorted(remaining):
+                    if remaining[cid] == 0 and cid not in blocked and unsettled.isdisjoint(self._table_filings(cid)):
+                        del remaining[cid]
+                        submit("evaluate", cid)
+
+            for filing in filings:
+                submit("decompose", filing)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = pending.pop(future)
+                    try:
+                        did_work = future.result()
+                    except Exception as e:
+                        print(f"[!] {stage} failed for {key}: {e}")
+                        failures.append((stage, key, str(e)))
+                        with self._stats_lock:
+                            self.stats.setdefault(stage, {"ran": 0, "skipped": 0, "failed": 0, "busy_s": 0.0})["failed"] += 1
+                        # a filing that never got canonical keeps its company from being evaluated, not its peers
+                        if stage in ("decompose", "canonicalize"):
+                            settle(key, ok=False)
+                        continue
+
+                    if stage == "decompose":
+                        if os.path.exists(self._decomposed_path(key)):
+                            submit("canonicalize", key)
+                        else:
+                            settle(key, ok=False)
+                    elif stage == "canonicalize":
+                        if self.indexer is not None:
+                            submit("index", key)
+                        settle(key)
+                    elif stage == "evaluate" and did_work:
+                        evaluated.append(key)
+
+        if evaluated:
+            self._publish(evaluated)
+        self.wall_s = time.perf_counter() - start
+        self.failures = failures
+        return self.stats
+
+    def _publish(self, evaluated):
+        # sector flags need every peer, the warehouse and fundamentals store only the changed filings
+        with span("pipeline.publish", companies=len(evaluated)):
+            reports, ids = [], []
+            for name in sorted(os.listdir(self.results_dir)):
+                if name.endswith("_eval.json"):
+                    with open(os.path.join(self.results_dir, name), 'r') as f:
+                        reports.append(json.load(f))
+                    ids.append(name[:-len("_eval.json")])
+
+            if os.path.exists(self.dataset_path):
+                changed = set(flag_sector_outliers(ids, reports, load_sectors(self.dataset_path)))
+                for i, (cid, report) in enumerate(zip(ids, reports)):
+                    if i in changed:
+                        with open(os.path.join(self.results_dir, f"{cid}_eval.json"), 'w') as f:
+                            json.dump(report, f, indent=4)
+
+            ResultsWarehouse(self.results_dir).refresh()
+
+            store = FundamentalsStore.load(self.fundamentals_path) if os.path.exists(self.fundamentals_path) else None
+            store = self.evaluator.build_fundamentals_store(evaluated, store=store)
+            store.save(self.fundamentals_path)
+
+    def report(self):
+        lines = [f"{'stage':<14}{'ran':>6}{'skipped':>9}{'failed':>8}{'busy s':>10}{'items/s':>10}"]
+        for stage in STAGES:
+            st = self.stats.get(stage)
+            if not st:
+                continue
+            rate = st["ran"] / st["busy_s"] if st["busy_s"] and st["ran"] else 0.0
+            lines.append(f"{stage:<14}{st['ran']:>6}{st['skipped']:>9}{st['failed']:>8}{st['busy_s']:>10.2f}{rate:>10.1f}")
+        lines.append(f"wall clock {self.wall_s:.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,181 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from .lazy_loader import lazy_module
+    from .tracing import span
+except ImportError:
+    from lazy_loader import lazy_module
+    from tracing import span
+
+yf = lazy_module("yfinance")
+
+DEFAULT_ROOT = os.environ.get("FINBENCH_PRICE_STORE", os.path.join("data", "prices"))
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _normalize_bars(history):
+    # yfinance frames -> naive daily index named Date, only the OHLCV columns
+    if history is None or history.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+    bars = history[[c for c in BAR_COLUMNS if c in history.columns]].astype("float64")
+    index = pd.DatetimeIndex(history.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    bars.index = index.normalize().rename("Date")
+    return bars[~bars.index.duplicated(keep="last")].sort_index()
+
+
+def _basis_changed(stored, fresh):
+    # yfinance prices are split/dividend adjusted, a new event rescales every earlier bar
+    common = stored.index.intersection(fresh.index)
+    if not len(common):
+        return False
+    return not np.allclose(stored.loc[common, "Close"], fresh.loc[common, "Close"], rtol=1e-6)
+
+
+def _write_frame(df, path, metadata=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"finbench": json.dumps(metadata).encode()})
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+class PriceStore:
+    # local OHLCV bars, one parquet partition per symbol, only new bars are fetched
+    def __init__(self, root=None, offline=None):
+        self.root = root or DEFAULT_ROOT
+        self.offline = offline if offline is not None else os.environ.get("FINBENCH_OFFLINE") == "1"
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(self.root, "_manifest.json")
+        self._manifest = None
+
+    def _bars_path(self, symbol):
+        return os.path.join(self.root, f"symbol={symbol.upper()}", "bars.parquet")
+
+    def _aligned_path(self, symbol, index_symbol):
+        return os.path.join(self.root, "aligned", f"{symbol.upper()}__{index_symbol.upper()}.parquet")
+
+    # manifest: symbol -> {"from", "to"}, the date range already fetched ("to" exclusive, like yfinance's end)
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self._manifest_path, 'r') as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _coverage(self, symbol, stored):
+        entry = self._load_manifest().get(symbol)
+        if isinstance(entry, str):
+            # older manifests only kept the end date, the stored bars tell where they start
+            entry = {"from": stored.index[0].strftime('%Y-%m-%d'), "to": entry} if len(stored) else None
+        return entry
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp, self._manifest_path)
+
+    def read(self, symbol):
+        path = self._bars_path(symbol)
+        if not os.path.exists(path):
+            return _normalize_bars(None)
+        return pq.read_table(path, memory_map=True).to_pandas()
+
+    def last_date(self, symbol):
+        bars = self.read(symbol)
+        return bars.index[-1] if len(bars) else None
+
+    def refresh(self, symbol, end=None, period_days=730):
+        # makes sure [end - period_days, end) is stored, returns the number of new bars written.
+        # only the missing older and newer stretches are fetched, so a past end_date works after a recent refresh
+        symbol = symbol.upper()
+        end = end or datetime.now().strftime('%Y-%m-%d')
+        start = (pd.Timestamp(end) - pd.Timedelta(days=period_days)).strftime('%Y-%m-%d')
+        with self._lock:
+            stored = self.read(symbol)
+            covered = self._coverage(symbol, stored)
+            if covered:
+                gaps = []
+                # each gap reaches one stored bar into the store, that bar shows whether the adjustment basis moved
+                if start < covered["from"]:
+                    overlap = (stored.index[0] + pd.Timedelta(days=1)).strftime('%Y-%m-%d') if len(stored) else covered["from"]
+                    gaps.append((start, max(overlap, covered["from"])))
+                if end > covered["to"]:
+                    overlap = stored.index[-1].strftime('%Y-%m-%d') if len(stored) else covered["to"]
+                    gaps.append((min(overlap, covered["to"]), end))
+            else:
+                gaps = [(start, end)]
+            if self.offline or not gaps:
+                return 0
+            with span("prices.refresh", symbol=symbol, gaps=len(gaps)) as s:
+                coverage = {
+                    "from": min(start, covered["from"]) if covered else start,
+                    "to": max(end, covered["to"]) if covered else end,
+                }
+                try:
+                    fresh = pd.concat([_normalize_bars(yf.Ticker(symbol).history(start=a, end=b)) for a, b in gaps])
+                    if len(stored) and _basis_changed(stored, fresh):
+                        # a split or dividend since the last refresh, the stored bars are re-downloaded on the new basis
+                        s.set(rebased=True)
+                        stored = _normalize_bars(None)
+                        fresh = _normalize_bars(yf.Ticker(symbol).history(start=coverage["from"], end=coverage["to"]))
+                except Exception as e:
+                    # offline or rate limited, whatever is stored is served
+                    s.set(error=str(e))
+                    return 0
+                fresh = fresh[~fresh.index.isin(stored.index)]
+                if len(fresh):
+                    merged = pd.concat([stored, fresh]) if len(stored) else fresh
+                    _write_frame(merged.sort_index(), self._bars_path(symbol))
+                self._manifest[symbol] = coverage
+                self._save_manifest()
+                s.set(new_bars=len(fresh))
+                return len(fresh)
+
+    def refresh_many(self, symbols, end=None, period_days=730):
+        return {symbol.upper(): self.refresh(symbol, end, period_days) for symbol in symbols}
+
+    def _source_key(self, symbol):
+        path = self._bars_path(symbol)
+        return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+    def aligned(self, symbol, index_symbol, end=None, period_days=730):
+        # stock bars with the index close on the stock's calendar, aligned once per source update
+        end = end or datetime.now().strftime('%Y-%m-%d')
+        self.refresh(symbol, end, period_days)
+        self.refresh(index_symbol, end, period_days)
+
+        key = {"stock": self._source_key(symbol), "index": self._source_key(index_symbol)}
+        path = self._aligned_path(symbol, index_symbol)
+        df = None
+        if os.path.exists(path):
+            table = pq.read_table(path, memory_map=True)
+            meta = json.loads((table.schema.metadata or {}).get(b"finbench", b"{}"))
+            if meta == key:
+                df = table.to_pandas()
+        if df is None:
+            df = self.read(symbol)
+            if df.empty:
+                return df
+            df = df.join(pd.DataFrame({'MARKET_INDEX': self.read(index_symbol)['Close']}), how='left')
+            df['MARKET_INDEX'] = df['MARKET_INDEX'].ffill().bfill() # Sinkronisasi kalender bursa
+            with self._lock:
+                _write_frame(df, path, key)
+
+        end_ts = pd.Timestamp(end)
+        return df[(df.index < end_ts) & (df.index >= end_ts - pd.Timedelta(days=period_days))].copy()
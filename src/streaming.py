@@ -0,0 +1,74 @@
+import queue
+import contextvars
+from contextlib import contextmanager
+
+# listener for the audit running on the current worker thread
+_stage_listener = contextvars.ContextVar("finbench_stage_listener", default=None)
+
+STAGE_LABELS = {
+    "fundamentals_ready": "Fundamentals acquired",
+    "structure_ready": "Structural metrics computed",
+    "benchmarks_ready": "Sector benchmarks ready",
+    "narratives_ready": "Context narratives retrieved",
+    "forecast_ready": "Forecast computed",
+}
+
+
+def emit_stage(stage, payload=None):
+    # no-op unless the caller is running inside an AuditStream
+    listener = _stage_listener.get()
+    if listener is not None:
+        listener(stage, payload)
+
+
+def current_listener():
+    return _stage_listener.get()
+
+
+@contextmanager
+def stage_listener(listener):
+    # routes emit_stage calls made on this thread, e.g. a worker running an audit for someone else
+    token = _stage_listener.set(listener)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+
+
+class AuditStream:
+    # runs one audit on a shared executor and hands its events back to the streamlit script thread
+    def __init__(self, executor, fn, *args):
+        self._events = queue.Queue()
+        self.result = None
+        self.future = executor.submit(self._run, fn, args)
+
+    def _run(self, fn, args):
+        token = _stage_listener.set(lambda stage, payload: self._events.put(("stage", stage, payload)))
+        try:
+            output = fn(*args)
+            if isinstance(output, (str, dict)) or not hasattr(output, "__iter__"):
+                self._events.put(("result", output, None))
+            else:
+                # streaming backends yield text chunks, optionally ending with the full result dict
+                for chunk in output:
+                    if isinstance(chunk, dict):
+                        self._events.put(("result", chunk, None))
+                    else:
+                        self._events.put(("token", chunk, None))
+            self._events.put(("done", None, None))
+        except Exception as e:
+            self._events.put(("error", e, None))
+        finally:
+            _stage_listener.reset(token)
+
+    def __iter__(self):
+        # ("stage", name, payload) / ("token", text, None) / ("result", value, None) until done
+        while True:
+            kind, value, payload = self._events.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            if kind == "result":
+                self.result = value
+            yield kind, value, payload
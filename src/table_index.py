@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# content hash -> {"table": table id whose csv holds the content, "refs": other table ids with the same content}
+CONTENT_INDEX = "_content_index.json"
+_LOCK_STALE_S = 60
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def content_hash(df):
+    # normalized content: trimmed lower-case headers plus the typed cells as csv text
+    header = "|".join(" ".join(str(c).split()).lower() for c in df.columns)
+    body = df.to_csv(index=False, header=False)
+    return hashlib.sha1(f"{header}\n{body}".encode('utf-8')).hexdigest()
+
+
+def read_index(directory):
+    try:
+        with open(os.path.join(directory, CONTENT_INDEX), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _thread_lock(directory):
+    key = os.path.abspath(directory)
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(key, threading.Lock())
+
+
+@contextmanager
+def _file_lock(directory):
+    # lock file so separate canonicalizer processes don't interleave index updates
+    path = os.path.join(directory, CONTENT_INDEX + ".lock")
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(path).st_mtime > _LOCK_STALE_S:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+class ContentIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+
+    @contextmanager
+    def locked(self):
+        # load, mutate, save under the lock
+        with _thread_lock(self.directory), _file_lock(self.directory):
+            self.entries = read_index(self.directory)
+            yield self
+            path = os.path.join(self.directory, CONTENT_INDEX)
+            tmp = path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, path)
+
+    def register(self, digest, table_id):
+        # returns the table id that stores this content, table_id itself when it is the first
+        entry = self.entries.get(digest)
+        if entry is None:
+            self.entries[digest] = {"table": table_id, "refs": []}
+            return table_id
+        if entry["table"] != table_id and table_id not in entry["refs"]:
+            entry["refs"].append(table_id)
+        return entry["table"]
+
+    def release(self, digest, table_id):
+        # table_id no longer holds this content, a remaining ref takes over the stored csv
+        entry = self.entries.get(digest)
+        if entry is None:
+            return
+        if table_id in entry["refs"]:
+            entry["refs"].remove(table_id)
+        elif entry["table"] == table_id:
+            if not entry["refs"]:
+                del self.entries[digest]
+                return
+            heir = entry["refs"].pop(0)
+            src = os.path.join(self.directory, f"{table_id}.csv")
+            if os.path.exists(src):
+                shutil.copyfile(src, os.path.join(self.directory, f"{heir}.csv"))
+            entry["table"] = heir
+
+    def owned(self):
+        return {entry["table"] for entry in self.entries.values()}
@@ -0,0 +1,182 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# active span for the current thread / task
+_current_span = contextvars.ContextVar("finbench_span", default=None)
+
+
+class _NoopSpan:
+    # shared span used when tracing is off, so the hot path only pays one flag check
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "span_id", "parent_id", "start", "duration", "error", "_perf", "_token")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = None
+        self.parent_id = None
+        self.start = 0.0
+        self.duration = 0.0
+        self.error = None
+        self._perf = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+        else:
+            self.trace_id = uuid.uuid4().hex
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._perf = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._perf
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+            "error": self.error
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self._file = None
+        self._lock = threading.Lock()
+        # name -> [count, total_seconds, max_seconds, errors]
+        self._stats = {}
+        self._server = None
+
+    def enable(self, trace_path=None):
+        with self._lock:
+            self.trace_path = trace_path
+            if self._file:
+                self._file.close()
+                self._file = None
+            if trace_path:
+                os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+                self._file = open(trace_path, 'a', encoding='utf-8')
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def current(self):
+        span = _current_span.get()
+        return span if span is not None else _NOOP_SPAN
+
+    def _finish(self, span):
+        with self._lock:
+            stat = self._stats.setdefault(span.name, [0, 0.0, 0.0, 0])
+            stat[0] += 1
+            stat[1] += span.duration
+            stat[2] = max(stat[2], span.duration)
+            if span.error:
+                stat[3] += 1
+            if self._file:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                self._file.flush()
+
+    def stats(self):
+        with self._lock:
+            return {name: {"count": s[0], "total_s": s[1], "max_s": s[2], "errors": s[3]} for name, s in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP finbench_span_seconds Time spent inside traced pipeline stages.",
+            "# TYPE finbench_span_seconds summary"
+        ]
+        maxima, errors = [], []
+        for name, s in sorted(self.stats().items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'finbench_span_seconds_count{{span="{label}"}} {s["count"]}')
+            lines.append(f'finbench_span_seconds_sum{{span="{label}"}} {s["total_s"]:.6f}')
+            maxima.append(f'finbench_span_seconds_max{{span="{label}"}} {s["max_s"]:.6f}')
+            errors.append(f'finbench_span_errors_total{{span="{label}"}} {s["errors"]}')
+        lines += ["# HELP finbench_span_seconds_max Slowest observed span.", "# TYPE finbench_span_seconds_max gauge"] + maxima
+        lines += ["# HELP finbench_span_errors_total Spans that exited with an error.", "# TYPE finbench_span_errors_total counter"] + errors
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port=9464, host="127.0.0.1"):
+        # prometheus scrape endpoint on a daemon thread
+        if self._server is not None:
+            return self._server
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = tracer.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="finbench-metrics", daemon=True).start()
+        return self._server
+
+
+tracer = Tracer()
+span = tracer.span
+
+
+# FINBENCH_TRACE=path/to/trace.jsonl turns tracing on for any entry point
+if os.environ.get("FINBENCH_TRACE"):
+    tracer.enable(os.environ["FINBENCH_TRACE"])
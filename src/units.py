@@ -0,0 +1,60 @@
+import re
+from collections import Counter
+
+UNIT_SCALE = {"units": 1.0, "thousands": 1e3, "millions": 1e6, "billions": 1e9}
+
+# captions such as "(in millions, except per share data)", "(Millions)", "thousands of dollars"
+_STRICT_UNIT = re.compile(r'\bin (thousands|millions|billions)\b|\((thousands|millions|billions)\b|\b(thousands|millions|billions) of\b')
+# table headers are short, a bare "million" there is already a scale marker
+_LOOSE_UNIT = re.compile(r'\b(thousand|million|billion)s?\b')
+_CURRENCY = [("USD", re.compile(r'\$|\busd\b|\bdollars?\b')), ("EUR", re.compile(r'€|\beur\b|\beuros?\b')), ("GBP", re.compile(r'£|\bgbp\b'))]
+
+# only the end of the text block sits right above the table
+CAPTION_WINDOW = 400
+
+
+def _unit_from(match):
+    word = next(g for g in match.groups() if g)
+    return word if word.endswith('s') else word + 's'
+
+
+def detect_unit(header_text, preceding_text="", rows_text=""):
+    # an explicit statement wins over a bare mention: "(in thousands)" beats a "Units shipped (millions)" row label.
+    # the loose match only ever sees the header row, data rows are labels and values
+    header = header_text.lower()
+    for text in (header, preceding_text[-CAPTION_WINDOW:].lower()):
+        m = _STRICT_UNIT.search(text)
+        if m:
+            return _unit_from(m)
+    m = _LOOSE_UNIT.search(header)
+    if m:
+        return _unit_from(m)
+    # some tables state the scale in a first row of its own ("| (in thousands) | | |") instead of a caption
+    first_row = [c.strip() for c in rows_text.strip().split('\n', 1)[0].strip('|').split('|')]
+    filled = [c for c in first_row if c and c.lower() not in ("nan", "0.0")]
+    m = _STRICT_UNIT.search(filled[0].lower()) if len(filled) == 1 else None
+    return _unit_from(m) if m else None
+
+
+def detect_currency(header_text, preceding_text="", rows_text=""):
+    for text in (header_text.lower() + "\n" + rows_text.lower(), preceding_text[-CAPTION_WINDOW:].lower()):
+        for currency, pattern in _CURRENCY:
+            if pattern.search(text):
+                return currency
+    return None
+
+
+def detect_context(header_text, preceding_text="", rows_text=""):
+    return detect_unit(header_text, preceding_text, rows_text), detect_currency(header_text, preceding_text, rows_text)
+
+
+def dominant(values):
+    # most common detected value, None when nothing was detected
+    counts = Counter(v for v in values if v)
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def rescale(value, from_unit, to_unit):
+    if from_unit == to_unit or from_unit not in UNIT_SCALE or to_unit not in UNIT_SCALE:
+        return value
+    return value * UNIT_SCALE[from_unit] / UNIT_SCALE[to_unit]
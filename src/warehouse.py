@@ -0,0 +1,166 @@
+import os
+import json
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    from .tracing import span
+except ImportError:
+    from tracing import span
+
+METRICS = ["revenue", "net_income", "assets", "liabilities"]
+
+SCHEMA = pa.schema(
+    [("company_id", pa.string()), ("entity", pa.string()), ("period", pa.string())]
+    + [f for m in METRICS for f in ((m, pa.float64()), (f"{m}_source", pa.string()))]
+    + [
+        ("net_margin", pa.float64()),
+        ("equity_deduced", pa.float64()),
+        ("equity_reliable", pa.bool_()),
+        ("identity_verified", pa.bool_()),
+        ("completeness", pa.float64()),
+        ("sanity_score", pa.float64()),
+        ("data_integrity", pa.string()),
+        ("anomaly_count", pa.int32()),
+        ("anomaly_types", pa.list_(pa.string())),
+        ("safe_to_reason", pa.bool_()),
+        ("reasoning_mode", pa.string()),
+        ("known_unknowns", pa.list_(pa.string())),
+        ("caution_note", pa.string()),
+        ("unit", pa.string()),
+        ("currency", pa.string()),
+        ("file_count", pa.int32()),
+        ("report_mtime_ns", pa.int64()),
+    ]
+)
+
+_OPS = {
+    "==": pc.equal, "!=": pc.not_equal, ">": pc.greater, ">=": pc.greater_equal,
+    "<": pc.less, "<=": pc.less_equal, "in": lambda col, vals: pc.is_in(col, value_set=pa.array(vals)),
+}
+
+
+def flatten_report(company_id, report, mtime_ns=0):
+    # one typed row per evaluation report
+    kb = report.get("knowledge_base", {})
+    observed = kb.get("observed", {})
+    proof = kb.get("accounting_proof", {})
+    status = report.get("epistemic_status", {})
+    contract = report.get("llm_semantic_contract", {})
+    metadata = report.get("metadata", {})
+    equity = proof.get("equity_deduced")
+
+    row = {"company_id": company_id, "entity": report.get("entity"), "period": report.get("period")}
+    for m in METRICS:
+        obs = observed.get(m) or {}
+        row[m] = obs.get("value")
+        row[f"{m}_source"] = obs.get("source")
+    row.update({
+        "net_margin": (kb.get("inferred", {}).get("net_margin") or {}).get("value"),
+        "equity_deduced": equity if isinstance(equity, (int, float)) else None,
+        "equity_reliable": isinstance(equity, (int, float)),
+        "identity_verified": proof.get("identity_verified"),
+        "completeness": status.get("completeness"),
+        "sanity_score": status.get("sanity_score"),
+        "data_integrity": status.get("data_integrity"),
+        "anomaly_count": len(report.get("anomalies", [])),
+        "anomaly_types": [a.get("type") for a in report.get("anomalies", [])],
+        "safe_to_reason": contract.get("safe_to_reason"),
+        "reasoning_mode": contract.get("reasoning_mode"),
+        "known_unknowns": contract.get("known_unknowns", []),
+        "caution_note": contract.get("caution_note"),
+        "unit": metadata.get("unit"),
+        "currency": metadata.get("currency"),
+        "file_count": len(metadata.get("files", [])),
+        "report_mtime_ns": mtime_ns,
+    })
+    return row
+
+
+class ResultsWarehouse:
+    def __init__(self, reports_dir, store_path=None):
+        self.reports_dir = reports_dir
+        self.store_path = store_path or os.path.join(os.path.dirname(os.path.abspath(reports_dir)), "evaluations.parquet")
+        self._rows = {}
+        self._table = None
+        self._dirty = False
+        if os.path.exists(self.store_path):
+            for row in pq.read_table(self.store_path).to_pylist():
+                self._rows[row["company_id"]] = row
+
+    # ingestion
+    def upsert_report(self, company_id, report, mtime_ns=0):
+        self._rows[company_id] = flatten_report(company_id, report, mtime_ns)
+        self._table = None
+        self._dirty = True
+
+    def refresh(self):
+        # only re-parses reports whose mtime moved since the last ingest
+        with span("warehouse.refresh") as s:
+            seen, updated = set(), 0
+            for entry in os.scandir(self.reports_dir):
+                if not entry.name.endswith("_eval.json"):
+                    continue
+                company_id = entry.name[:-len("_eval.json")]
+                seen.add(company_id)
+                mtime_ns = entry.stat().st_mtime_ns
+                row = self._rows.get(company_id)
+                if row is not None and row["report_mtime_ns"] == mtime_ns:
+                    continue
+                try:
+                    with open(entry.path, 'r') as f:
+                        self.upsert_report(company_id, json.load(f), mtime_ns)
+                    updated += 1
+                except (OSError, ValueError) as e:
+                    print(f"[!] Warehouse skipped {entry.name}: {e}")
+            for company_id in set(self._rows) - seen:
+                del self._rows[company_id]
+                self._table, self._dirty = None, True
+            if self._dirty:
+                self.save()
+            s.set(updated=updated, rows=len(self._rows))
+            return updated
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        tmp = self.store_path + ".tmp"
+        pq.write_table(self.table, tmp)
+        os.replace(tmp, self.store_path)
+        self._dirty = False
+
+    @property
+    def table(self):
+        if self._table is None:
+            rows = [self._rows[k] for k in sorted(self._rows)]
+            self._table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        return self._table
+
+    # queries
+    def filter(self, table=None, **conditions):
+        # filter(identity_verified=False), filter(sanity_score=("<", 0.6)), filter(entity=("in", [...]))
+        table = self.table if table is None else table
+        mask = None
+        for column, cond in conditions.items():
+            op, value = cond if isinstance(cond, tuple) else ("==", cond)
+            expr = _OPS[op](table[column], value)
+            mask = expr if mask is None else pc.and_(mask, expr)
+        return table if mask is None else table.filter(mask)
+
+    def group_by(self, keys, aggregations, table=None):
+        # group_by("data_integrity", [("sanity_score", "mean"), ("company_id", "count")])
+        table = self.table if table is None else table
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        return table.group_by(keys).aggregate(list(aggregations))
+
+    def top_k(self, column, k=10, ascending=False, table=None):
+        table = self.table if table is None else table
+        order = "ascending" if ascending else "descending"
+        table = table.filter(pc.is_valid(table[column]))
+        return table.take(pc.sort_indices(table, sort_keys=[(column, order)])[:k])
+
+    def sql(self, query):
+        # optional: plain SQL over the same table when duckdb is installed
+        import duckdb
+        evaluations = self.table  # noqa: F841, resolved by name from the query
+        return duckdb.sql(query).arrow()
@@ -0,0 +1,67 @@
+import itertools
+
+from src.batch_validator import validate_batch
+
+
+def scalar_report(company_id, raw):
+    # the per-company scoring FinancialEvaluator.analyze_company did before validation was batched
+    obs = raw["observed"]
+    inferred = {}
+    rev, ni = obs["revenue"]["value"], obs["net_income"]["value"]
+    if rev != 0 and ni != 0:
+        inferred["net_margin"] = {"value": round(ni / rev, 4), "method": "deduced_from_observed", "formula": "net_income / revenue"}
+    assets, liab = obs["assets"]["value"], obs["liabilities"]["value"]
+    equity_calc = round(assets - liab, 2)
+    anomalies = []
+    is_collision = (assets == liab and assets != 0)
+    identity_holds = (assets != 0 and liab != 0 and abs(assets - (liab + equity_calc)) < 1.0)
+    if is_collision:
+        anomalies.append({"type": "data_collision", "severity": "CRITICAL", "rationale": "Assets == Liabilities detected."})
+    completeness = sum(1 for v in obs.values() if v["value"] != 0) / 4
+    sanity_score = 1.0
+    if is_collision: sanity_score -= 0.8
+    if not identity_holds and assets != 0: sanity_score -= 0.4
+    if raw["metadata"]["currency"] == "Unknown": sanity_score -= 0.2
+    sanity_score = max(0.1, round(sanity_score, 2))
+    return {
+        "entity": company_id.split('_')[0],
+        "period": company_id.split('_')[1],
+        "knowledge_base": {
+            "observed": obs,
+            "inferred": inferred,
+            "accounting_proof": {
+                "equity_deduced": equity_calc if not is_collision else "UNRELIABLE",
+                "identity_verified": identity_holds,
+            },
+        },
+        "epistemic_status": {
+            "completeness": completeness,
+            "sanity_score": sanity_score,
+            "data_integrity": "PASSED" if sanity_score > 0.6 and not is_collision else "FAILED",
+        },
+        "anomalies": anomalies,
+        "llm_semantic_contract": {
+            "safe_to_reason": (completeness >= 0.75 and sanity_score >= 0.6),
+            "reasoning_mode": "deductive" if identity_holds else "investigative",
+            "known_unknowns": [k for k, v in obs.items() if v["value"] == 0],
+            "caution_note": "Identity failure detected" if not identity_holds and assets != 0 else None,
+        },
+        "metadata": raw["metadata"],
+    }
+
+
+def _raw(revenue, net_income, assets, liabilities, currency):
+    values = {"revenue": revenue, "net_income": net_income, "assets": assets, "liabilities": liabilities}
+    return {
+        "observed": {k: {"value": v, "source": f"{k}.csv" if v else None} for k, v in values.items()},
+        "metadata": {"unit": "millions", "currency": currency, "files": []},
+    }
+
+
+def test_batch_matches_the_scalar_path():
+    grid = itertools.product([0.0, 2015.3], [0.0, -310.25], [0.0, 9100.0, 5200.0], [0.0, 5200.0, 0.004], ["USD", "Unknown"])
+    raws = [_raw(*values) for values in grid]
+    ids = [f"ACME_{2000 + i}" for i in range(len(raws))]
+    batch = validate_batch(ids, raws)
+    for cid, raw, report in zip(ids, raws, batch):
+        assert report == scalar_report(cid, raw), cid
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from src.evaluator import FinancialEvaluator
+from src.fundamentals_store import FundamentalsStore
+
+
+def _write(directory, name, df):
+    df.to_csv(directory / name, index=False)
+
+
+def test_values_in_the_first_rows_are_not_periods(tmp_path):
+    # 2,015.3 and 1,980 are canonicalized to 2015.3 and 1980.0
+    _write(tmp_path, "ACME_2022_10K_t1.csv", pd.DataFrame({
+        "Item": ["Total revenue", "Net income", "Total assets"],
+        "2022": [2015.3, 310.0, 9100.0],
+        "2021": [1980.0, 290.0, 8700.0],
+    }))
+    store = FinancialEvaluator(str(tmp_path), use_cache=False).build_fundamentals_store()
+    assert store.periods("ACME") == ["2021", "2022"]
+    assert store.get("ACME", "2022", "revenue") == 2015.3
+
+
+def test_period_row_below_the_header_still_counts(tmp_path):
+    _write(tmp_path, "ACME_2022_10K_t1.csv", pd.DataFrame({
+        "Item": ["", "Total revenue"],
+        "Fiscal year": [2022.0, 2015.3],
+        "Col_2": [2021.0, 1980.0],
+    }))
+    store = FinancialEvaluator(str(tmp_path), use_cache=False).build_fundamentals_store(store=FundamentalsStore())
+    assert store.periods("ACME") == ["2021", "2022"]
+    assert store.get("ACME", "2021", "revenue") == 1980.0
+
+
+def test_interim_filings_stay_out_of_the_annual_scan(tmp_path):
+    annual = pd.DataFrame({"Item": ["Total assets"], "2023": [9100.0], "2022": [8700.0]})
+    interim = pd.DataFrame({"Item": ["Total assets"], "2023": [9400.0], "2022": [8650.0]})
+    _write(tmp_path, "AMCOR_2023_10K_1.csv", annual)
+    _write(tmp_path, "AMCOR_2023Q2_10Q_1.csv", interim)
+    evaluator = FinancialEvaluator(str(tmp_path), use_cache=False)
+    assert evaluator._get_metrics("AMCOR_2023")["metadata"]["files"] == ["AMCOR_2023_10K_1.csv"]
+
+    store = evaluator.build_fundamentals_store()
+    assert store.get("AMCOR", "2023", "assets") == 9100.0
+    assert store.get("AMCOR", "2022", "assets") == 8700.0
+    assert store.get("AMCOR", "2023Q2", "assets") == 9400.0
+    # a 10-Q's prior-year balance is the fiscal year-end, never the same quarter a year earlier
+    assert store.get("AMCOR", "2022Q2", "assets") is None
+
+
+def test_batch_serves_cached_reports_and_scans_only_misses(tmp_path):
+    for cid, revenue in (("ACME_2022", 2015.3), ("BETA_2022", 880.0)):
+        _write(tmp_path, f"{cid}_10K_t1.csv", pd.DataFrame({
+            "Item": ["Total revenue", "Net income"],
+            "2022": [revenue, 90.0],
+            "2021": [revenue - 100, 80.0],
+        }))
+    evaluator = FinancialEvaluator(str(tmp_path), cache_dir=str(tmp_path / "cache"))
+    first = evaluator.analyze_company("ACME_2022")
+
+    scanned = []
+    get_metrics = evaluator._get_metrics
+    evaluator._get_metrics = lambda cid: scanned.append(cid) or get_metrics(cid)
+    reports = evaluator.analyze_companies(["ACME_2022", "BETA_2022"], sectors={})
+    assert scanned == ["BETA_2022"]
+    assert reports[0] == first
+
+    # a fresh evaluator finds both on disk
+    fresh = FinancialEvaluator(str(tmp_path), cache_dir=str(tmp_path / "cache"))
+    fresh._get_metrics = lambda cid: scanned.append(cid) or get_metrics(cid)
+    assert fresh.analyze_companies(["ACME_2022", "BETA_2022"]) == reports
+    assert scanned == ["BETA_2022"]
@@ -0,0 +1,24 @@
+from src.fundamentals_store import FundamentalsStore
+
+
+def test_prior_year_end_from_a_10q_only_fills_a_gap():
+    store = FundamentalsStore()
+    store.add("ACME", "2022", "assets", 8650.0, filing="2023Q2_10Q", fallback=True)
+    assert store.get("ACME", "2022", "assets") == 8650.0
+    store.add("ACME", "2022", "assets", 8700.0, filing="2022_10K")
+    store.add("ACME", "2022", "assets", 8600.0, filing="2023Q3_10Q", fallback=True)
+    assert store.get("ACME", "2022", "assets") == 8700.0
+
+
+def test_series_keep_one_scale():
+    store = FundamentalsStore()
+    store.add("ACME", "2021", "revenue", 1900.0, filing="2021_10K")
+    store.add("ACME", "2022", "revenue", 1980.0, filing="2022_10K")
+    store.add("ACME", "2023", "revenue", 2015300000.0, filing="2023_10K", unit="units")
+    store.add("ACME", "2023", "net_income", 310.0, filing="2023_10K")
+    store.add("ACME", "2022", "net_income", 290.0, filing="2022_10K")
+
+    assert store.series("ACME", "revenue") == [("2021", 1900.0), ("2022", 1980.0)]
+    assert store.series("ACME", "revenue", unit="units") == [("2023", 2015300000.0)]
+    assert set(store.growth("ACME")["yoy"]) == {"2022"}
+    assert store.margin_series("ACME") == [("2022", round(290.0 / 1980.0, 4))]
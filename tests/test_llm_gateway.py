@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.llm_gateway import LLMGateway, is_rate_limited
+from src.streaming import AuditStream, emit_stage
+
+
+class StageBridge:
+    def __init__(self):
+        self.calls = 0
+
+    def smart_query(self, prompt):
+        self.calls += 1
+        emit_stage("fundamentals_ready", {"ticker": "ACME"})
+        emit_stage("benchmarks_ready", {"ticker": "ACME"})
+        return {"answer": f"audit of {prompt}", "sources": []}
+
+
+class BatchingStageBridge(StageBridge):
+    def smart_query_batch(self, prompts):
+        return [self.smart_query(p) for p in prompts]
+
+
+def _events(client, prompt):
+    with ThreadPoolExecutor(1) as executor:
+        return [(kind, value) for kind, value, _ in AuditStream(executor, client.smart_query, prompt)]
+
+
+def test_stages_reach_the_caller_through_the_gateway():
+    for backend in (StageBridge(), BatchingStageBridge()):
+        gateway = LLMGateway(backend)
+        try:
+            direct = _events(backend, "ACME")
+            gated = _events(gateway, "ACME")
+        finally:
+            gateway.close()
+        assert [kind for kind, _ in gated] == ["stage", "stage", "result"]
+        assert gated == direct
+
+
+def test_cache_hit_skips_the_backend():
+    backend = StageBridge()
+    gateway = LLMGateway(backend)
+    try:
+        first = gateway.smart_query("Audit ACME?")
+        second = gateway.smart_query("audit  acme")
+    finally:
+        gateway.close()
+    assert first == second
+    assert backend.calls == 1
+
+
+AUDIT_ANSWER = (
+    "[AUDIT] ACME's capital structure is conservative: total liabilities of 5,200.0 against assets of 9,100.0 "
+    "leave deduced equity of 3,900.0 and the accounting identity holds. The revolving facility carries an interest "
+    "rate limit of 6%, and the covenant package caps leverage at 3.5x EBITDA, which the company clears comfortably. "
+    "Net margin of 15.4% sits inside the sector band."
+)
+
+
+def test_rate_limit_detection_ignores_ordinary_answers():
+    assert is_rate_limited({"answer": "Rate Limit reached, please try again later."})
+    assert is_rate_limited({"answer": "rate limit reached"})
+    assert is_rate_limited({"answer": "PRECISION LOCK: token has reached its daily quota"})
+    # the bridge's own wording counts wherever it appears
+    assert is_rate_limited({"answer": "Sorry.\n\nYour token has reached the limit for today."})
+    assert is_rate_limited({"answer": "", "status_code": 429})
+    assert not is_rate_limited({"answer": AUDIT_ANSWER})
+    assert not is_rate_limited({"answer": AUDIT_ANSWER.replace("interest rate limit", "Rate Limit")})
+
+
+class StreamingBridge(StageBridge):
+    # the first call is refused with the bridge's quota notice, later ones stream tokens then the result
+    def __init__(self):
+        super().__init__()
+        self.streams = 0
+
+    def stream_query(self, prompt):
+        self.streams += 1
+        if self.streams == 1:
+            yield {"answer": "Rate Limit reached, please try again later.", "sources": []}
+            return
+        emit_stage("fundamentals_ready", {"ticker": "ACME"})
+        yield "audit "
+        yield "of ACME"
+        yield {"answer": "audit of ACME", "sources": ["10K"]}
+
+
+def test_streamed_misses_retry_and_are_cached():
+    backend = StreamingBridge()
+    gateway = LLMGateway(backend, base_backoff=0.01, max_backoff=0.02)
+    try:
+        with ThreadPoolExecutor(1) as executor:
+            events = [(kind, value) for kind, value, _ in AuditStream(executor, gateway.stream_query, "ACME")]
+        again = list(gateway.stream_query("acme"))
+    finally:
+        gateway.close()
+    assert events == [
+        ("stage", "fundamentals_ready"), ("token", "audit "), ("token", "of ACME"),
+        ("result", {"answer": "audit of ACME", "sources": ["10K"]}),
+    ]
+    assert again == [{"answer": "audit of ACME", "sources": ["10K"]}]
+    assert backend.streams == 2
+    assert gateway.stats["rate_limited"] == 1
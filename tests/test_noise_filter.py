@@ -0,0 +1,45 @@
+import pytest
+
+from src.noise_filter import NoiseClassifier
+
+
+@pytest.mark.parametrize("query", [
+    "How does Amcor recognize revenue?",
+    "Reconcile net income to operating cash flow",
+    "What was the record revenue in 2022?",
+    "Surgery volumes drove the segment",
+    "How did hyperinflation in Argentina affect margins?",
+    "What is the long-term debt maturity profile?",
+    "Was the share buy-back funded with debt?",
+    "Does the company belong to the S&P 500?",
+])
+def test_accounting_questions_are_clean(query):
+    report = NoiseClassifier().classify(query)
+    assert report["noise_elements"] == []
+    assert report["action"] == "IGNORE"
+
+
+@pytest.mark.parametrize("query, term", [
+    ("Should I buy ACME?", "buy"),
+    ("Do you recommend ACME?", "recommend"),
+    ("Any recommendations on ACME?", "recommend"),
+    ("Which analysts recommended ACME?", "recommend"),
+    ("What is the price target for ACME?", "target"),
+])
+def test_speculative_questions_block(query, term):
+    report = NoiseClassifier().classify(query)
+    assert term in report["noise_elements"]
+    assert report["action"] == "BLOCK_RECO"
+
+
+@pytest.mark.parametrize("query, term", [
+    ("Is the ACME hype justified?", "hype"),
+    ("Why was ACME so hyped?", "hype"),
+    ("Why did ACME surge today?", "surge"),
+    ("ACME surged after earnings", "surge"),
+    ("Why is ACME plunging?", "plunging"),
+])
+def test_sentiment_and_temporal_terms_are_flagged(query, term):
+    report = NoiseClassifier().classify(query)
+    assert term in report["noise_elements"]
+    assert report["action"] == "IGNORE"
@@ -0,0 +1,83 @@
+import json
+import time
+import shutil
+
+from src.pipeline import FilingPipeline
+
+FILING = """## Consolidated Statements of Operations
+
+(in millions)
+
+| Item | 2022 | 2021 |
+|---|---:|---:|
+| Total revenue | $ 2,015.3 | $ 1,980.0 |
+| Net income | 310.2 | 290.4 |
+| Total assets | 9,100.0 | 8,700.0 |
+| Total liabilities | 5,200.0 | 4,900.0 |
+"""
+
+
+def _observed(root):
+    with open(root / "results" / "evaluations" / "ACME_2022_eval.json") as f:
+        observed = json.load(f)["knowledge_base"]["observed"]
+    return {metric: obs["value"] for metric, obs in observed.items()}
+
+
+def test_deleted_canonical_tables_are_rebuilt(tmp_path):
+    markdown = tmp_path / "processed" / "markdown"
+    markdown.mkdir(parents=True)
+    (markdown / "ACME_2022_10K.md").write_text(FILING, encoding="utf-8")
+
+    pipeline = FilingPipeline(str(tmp_path), workers=2)
+    pipeline.run()
+    first = _observed(tmp_path)
+    assert first["revenue"] == 2015.3
+
+    pipeline.run()
+    assert pipeline.stats["canonicalize"]["skipped"] == 1
+
+    shutil.rmtree(tmp_path / "processed" / "canonical")
+    pipeline = FilingPipeline(str(tmp_path), workers=2)
+    pipeline.run()
+    assert pipeline.stats["canonicalize"]["ran"] == 1
+    assert _observed(tmp_path) == first
+
+
+class RecordingPipeline(FilingPipeline):
+    # slows one filing's canonicalize down and records when nodes start and finish
+    slow = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events = []
+
+    def _run_node(self, stage, key, force):
+        self.events.append(("start", stage, key))
+        if stage == "canonicalize" and key == self.slow:
+            time.sleep(0.3)
+        try:
+            return super()._run_node(stage, key, force)
+        finally:
+            self.events.append(("end", stage, key))
+
+
+def test_evaluate_waits_for_the_filing_holding_its_tables(tmp_path):
+    markdown = tmp_path / "processed" / "markdown"
+    markdown.mkdir(parents=True)
+    shared = FILING.replace("| 2022 | 2021 |", "| 2023 | 2022 |")
+    (markdown / "ACME_2022_10K.md").write_text(shared, encoding="utf-8")
+    (markdown / "ACME_2023_10K.md").write_text(shared, encoding="utf-8")
+    FilingPipeline(str(tmp_path), workers=1).run()
+
+    # ACME_2023's table is stored under ACME_2022_10K, which now changes and hands the csv over
+    (markdown / "ACME_2022_10K.md").write_text(shared.replace("1,980.0", "1,990.0"), encoding="utf-8")
+    (markdown / "ACME_2023_10K.md").write_text(shared + "\n", encoding="utf-8")
+    pipeline = RecordingPipeline(str(tmp_path), workers=4)
+    pipeline.slow = "ACME_2022_10K"
+    pipeline.run()
+
+    assert pipeline.failures == []
+    events = pipeline.events
+    assert events.index(("start", "evaluate", "ACME_2023")) > events.index(("end", "canonicalize", "ACME_2022_10K"))
+    with open(tmp_path / "results" / "evaluations" / "ACME_2023_eval.json") as f:
+        assert json.load(f)["knowledge_base"]["observed"]["revenue"]["value"] == 2015.3
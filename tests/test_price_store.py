@@ -0,0 +1,69 @@
+import pandas as pd
+
+from src import price_store
+from src.price_store import PriceStore
+
+
+class FakeTicker:
+    # adjusted prices like yfinance: every bar before a split is divided by its ratio
+    calls = []
+    splits = {}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, start=None, end=None, period=None):
+        FakeTicker.calls.append((self.symbol, start, end))
+        index = pd.bdate_range(start, end, inclusive="left", tz="America/New_York")
+        close = pd.Series([100.0 + d.toordinal() % 50 for d in index], index=index)
+        for date, ratio in FakeTicker.splits.items():
+            close[index.tz_localize(None) < pd.Timestamp(date)] /= ratio
+        return pd.DataFrame({c: close for c in price_store.BAR_COLUMNS}, index=index)
+
+
+def _unadjusted(date):
+    return 100.0 + pd.Timestamp(date).toordinal() % 50
+
+
+class FakeYF:
+    Ticker = FakeTicker
+
+
+def test_past_end_date_after_a_recent_refresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "yf", FakeYF)
+    FakeTicker.calls, FakeTicker.splits = [], {}
+    store = PriceStore(root=str(tmp_path), offline=False)
+
+    recent = store.aligned("ACME", "^GSPC", end="2026-10-19")
+    assert len(recent) > 400
+
+    past = store.aligned("ACME", "^GSPC", end="2023-06-01")
+    assert len(past) > 400
+    assert past.index.max() < pd.Timestamp("2023-06-01")
+    # only the older stretch was fetched, up to and including the first stored bar
+    assert ("ACME", "2021-06-01", "2024-10-22") in FakeTicker.calls
+
+    calls = len(FakeTicker.calls)
+    store.aligned("ACME", "^GSPC", end="2024-01-02")
+    assert len(FakeTicker.calls) == calls
+
+
+def test_split_rebases_the_stored_bars(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "yf", FakeYF)
+    FakeTicker.calls, FakeTicker.splits = [], {}
+    store = PriceStore(root=str(tmp_path), offline=False)
+    store.refresh("ACME", end="2026-06-01")
+    assert store.read("ACME").loc["2026-03-02", "Close"] == _unadjusted("2026-03-02")
+
+    FakeTicker.splits = {"2026-08-03": 2.0}
+    store.refresh("ACME", end="2026-10-19")
+    bars = store.read("ACME")
+    assert bars.loc["2026-03-02", "Close"] == _unadjusted("2026-03-02") / 2
+    assert bars.loc["2026-09-01", "Close"] == _unadjusted("2026-09-01")
+    assert bars.index.min() == pd.Timestamp("2024-06-03")
+
+    # no new event, only the new stretch is fetched again
+    calls = len(FakeTicker.calls)
+    store.refresh("ACME", end="2026-10-26")
+    assert len(FakeTicker.calls) == calls + 1
+    assert store.read("ACME").loc["2026-03-02", "Close"] == _unadjusted("2026-03-02") / 2
@@ -0,0 +1,75 @@
+import json
+import os
+
+from src.canonicalizer import FinancialCanonicalizer
+from src.evaluator import FinancialEvaluator
+from src.table_index import read_index
+
+SHARED = """| (in millions) | 2023 | 2022 |
+|---|---:|---:|
+| Total revenue | $ 2,015.3 | $ 1,980.0 |
+| Net income | 310.2 | 290.4 |
+| Total assets | 9,100.0 | 8,700.0 |
+| Total liabilities | 5,200.0 | 4,900.0 |"""
+
+REVISED = SHARED.replace("1,980.0", "1,990.0")
+
+
+def _canonicalize(root, filing, table):
+    decomposed = root / f"{filing}_decomposed.json"
+    items = [
+        {"id": f"{filing}_0", "type": "text", "content": "Consolidated Statements of Operations (in millions)"},
+        {"id": f"{filing}_1", "type": "table", "content": table},
+    ]
+    decomposed.write_text(json.dumps(items), encoding="utf-8")
+    out = root / "canonical"
+    out.mkdir(exist_ok=True)
+    FinancialCanonicalizer().process_file(str(decomposed), str(out))
+    return out
+
+
+def _sidecar(out, filing):
+    with open(out / f"{filing}.tables.json", encoding="utf-8") as f:
+        return json.load(f)["tables"][f"{filing}_1"]
+
+
+def test_duplicate_is_stored_once(tmp_path):
+    _canonicalize(tmp_path, "ACME_2022_10K", SHARED)
+    out = _canonicalize(tmp_path, "ACME_2023_10K", SHARED)
+    assert os.path.exists(out / "ACME_2022_10K_1.csv")
+    assert not os.path.exists(out / "ACME_2023_10K_1.csv")
+    assert _sidecar(out, "ACME_2023_10K")["stored_as"] == "ACME_2022_10K_1"
+
+
+def test_ref_inherits_the_csv_when_the_owner_changes(tmp_path):
+    _canonicalize(tmp_path, "ACME_2022_10K", SHARED)
+    _canonicalize(tmp_path, "ACME_2023_10K", SHARED)
+    shared_hash = _sidecar(tmp_path / "canonical", "ACME_2023_10K")["content_hash"]
+
+    # the owner is re-canonicalized with different content
+    out = _canonicalize(tmp_path, "ACME_2022_10K", REVISED)
+    index = read_index(str(out))
+    assert index[shared_hash] == {"table": "ACME_2023_10K_1", "refs": []}
+    assert os.path.exists(out / "ACME_2023_10K_1.csv")
+    # the owner keeps its own, now distinct, table
+    assert os.path.exists(out / "ACME_2022_10K_1.csv")
+    assert _sidecar(out, "ACME_2022_10K")["stored_as"] == "ACME_2022_10K_1"
+
+
+def test_evaluation_follows_the_owner_change(tmp_path):
+    _canonicalize(tmp_path, "ACME_2022_10K", SHARED)
+    out = _canonicalize(tmp_path, "ACME_2023_10K", SHARED)
+    evaluator = FinancialEvaluator(str(out), use_cache=False)
+    before = evaluator._get_metrics("ACME_2023")
+    assert before["observed"]["revenue"]["value"] == 2015.3
+
+    # the sidecar of ACME_2023 still says stored_as ACME_2022_10K_1, whose csv now holds other content
+    _canonicalize(tmp_path, "ACME_2022_10K", REVISED)
+    assert _sidecar(out, "ACME_2023_10K")["stored_as"] == "ACME_2022_10K_1"
+    after = FinancialEvaluator(str(out), use_cache=False)._get_metrics("ACME_2023")
+
+    assert after["metadata"]["files"] == ["ACME_2023_10K_1.csv"]
+    for metric, obs in before["observed"].items():
+        assert after["observed"][metric]["value"] == obs["value"]
+        assert after["observed"][metric]["source"] == "ACME_2023_10K_1.csv"
+    assert FinancialEvaluator(str(out), use_cache=False)._get_metrics("ACME_2022")["observed"]["revenue"]["value"] == 1990.0
@@ -0,0 +1,14 @@
+from src.units import detect_context, detect_unit
+
+
+def test_caption_statement_wins_over_a_row_label():
+    header = "| Item | 2022 | 2021 |"
+    rows = "| Units shipped (millions) | 4 | 3 |\n| Revenue | 2,015 | 1,980 |"
+    assert detect_context(header, "Segment results (in thousands of dollars)", rows) == ("thousands", "USD")
+    assert detect_unit(header, "", rows) is None
+
+
+def test_header_and_statement_rows():
+    assert detect_unit("| ($ in millions) | 2022 | 2021 |") == "millions"
+    assert detect_unit("| Item | 2022 Billion | 2021 |") == "billions"
+    assert detect_unit("| Item | 2022 | 2021 |", "", "| (in thousands) | | |") == "thousands"